@@ -12,42 +12,11 @@ import tkinter as tk
 from tkinter import ttk
 from tkinter.filedialog import askopenfilenames
 from tkinter.messagebox import showinfo
-from dateutil.parser import parse
-import requests, certifi
-
-# ---------------- utilidades de feriados ----------------
-def fetch_holidays_chile(years=None):
-    if years is None:
-        years = [datetime.date.today().year]
-    url_primary = "https://apis.digital.gob.cl/fl/feriados"
-    try:
-        resp = requests.get(url_primary, headers={"User-Agent":"My User Agent 1.0"}, verify=certifi.where(), timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        fechas = [parse(d["fecha"]).date() for d in data]
-        return pd.DataFrame({"fecha": fechas})
-    except Exception:
-        all_dates = []
-        for y in years:
-            try:
-                url = f"https://date.nager.at/api/v3/PublicHolidays/{y}/CL"
-                r = requests.get(url, timeout=10)
-                r.raise_for_status()
-                js = r.json()
-                all_dates.extend([parse(i["date"]).date() for i in js])
-            except Exception:
-                continue
-        return pd.DataFrame({"fecha": all_dates})
-
-def working_holidays_frequency(holidays_df):
-    if holidays_df.empty:
-        return pd.DataFrame(columns=["Year","Month","Holidays"])
-    holidays_df = holidays_df.copy()
-    holidays_df["weekday"] = holidays_df["fecha"].apply(lambda d: d.weekday())
-    holidays_df = holidays_df[holidays_df["weekday"] <= 4]
-    holidays_df["Year"] = holidays_df["fecha"].apply(lambda d: d.year)
-    holidays_df["Month"] = holidays_df["fecha"].apply(lambda d: d.month)
-    return holidays_df.groupby(["Year","Month"]).size().reset_index(name="Holidays")
+from planillas import extract_planilla
+from feriados import fetch_holidays_chile
+from objetivos import WorkCalendar, EmployeeCalendar
+from agregacion import HoursBuilder, consolidate
+from duplicados import collapse_copies
 
 # ---------------- conversión de mes ----------------
 def month_number(mes_str):
@@ -122,45 +91,44 @@ def a1_notation(row, col):
 def inspect_sheet_for_errors(path: Path):
     errors = []
     try:
-        df = pd.read_excel(path, engine="openpyxl")
+        rec = extract_planilla(path)
     except Exception as e:
         errors.append(f"{path.name}: Error al abrir archivo: {e}")
         return None, errors
 
     # Mes (D2)
     try:
-        month_raw = df.iloc[1,3]
-        month_number(month_raw)
+        month_number(rec.month_raw)
     except Exception as e:
         errors.append(f"{path.name}: error en celda {a1_notation(1,3)} -> {e}")
 
     # Año (L2)
     try:
-        year_raw = df.iloc[1,11]
-        int(year_raw)
+        int(rec.year_raw)
     except Exception as e:
         errors.append(f"{path.name}: error en celda {a1_notation(1,11)} -> {e}")
 
     if errors:
         return None, errors
-    return df, []
+    return rec, []
 
 # ---------------- análisis principal ----------------
-def analyze(selected_files, holidays_freq, log_ui):
+def analyze(selected_files, calendar, log_ui):
     valid_links = []
-    dfs = []
+    records = []
     all_errors = []
 
+    selected_files = collapse_copies(selected_files, log_ui.log)
     for p in selected_files:
         log_ui.log(f"Inspeccionando: {p.name}")
-        df, errors = inspect_sheet_for_errors(p)
+        rec, errors = inspect_sheet_for_errors(p)
         if errors:
             all_errors.extend(errors)
             for e in errors:
                 log_ui.log(f"  - {e}")
-        if df is not None:
+        if rec is not None:
             valid_links.append(p)
-            dfs.append(df)
+            records.append(rec)
             log_ui.log(f"  → Archivo válido: {p.name}")
         else:
             log_ui.log(f"  → Archivo omitido: {p.name}")
@@ -169,76 +137,24 @@ def analyze(selected_files, holidays_freq, log_ui):
         log_ui.log("No hay archivos válidos para procesar. Fin del análisis.")
         return None, None
 
-    # Construir Omega y Alfa
-    Rg = pd.DataFrame()
+    # Construir Alfa (una fila por planilla, proyectos repetidos sumados)
+    builder = HoursBuilder()
     for idx, p in enumerate(valid_links):
-        df = dfs[idx]
+        rec = records[idx]
         try:
-            Name = df.columns[4]
-            Month = month_number(df.iloc[1,3])
-            Year = int(df.iloc[1,11])
-            Proyectos = df.iloc[3, 15:34].reset_index(drop=True).tolist()
-            Total_Hours = df.iloc[37, 15:34].reset_index(drop=True).tolist()
-            cols = ["Name","Month","Year"] + Proyectos
-            row = [Name, Month, Year] + Total_Hours
-            row_dict = dict(zip(cols,row))
-            row_dict["Links"] = str(p)
-            betaux = pd.DataFrame([row_dict])
-            if "TOTAL" in betaux.columns:
-                betaux = betaux.drop(columns=["TOTAL"])
-            Rg = pd.concat([Rg, betaux], ignore_index=True, sort=False)
-            Rg.fillna(0, inplace=True)
+            builder.add(rec.name, month_number(rec.month_raw), int(rec.year_raw), rec.projects, rec.totals, link=str(p))
         except Exception as e:
             log_ui.log(f"Error procesando {p.name}: {e}")
-
-    # Segunda pasada: Alfa
-    Alfa = pd.DataFrame()
-    for idx, p in enumerate(valid_links):
-        df = dfs[idx]
-        Name = df.columns[4]
-        Month = month_number(df.iloc[1,3])
-        Year = int(df.iloc[1,11])
-        Proyectos = df.iloc[3, 15:34].reset_index(drop=True).tolist()
-        Total_Hours = df.iloc[37, 15:34].reset_index(drop=True).tolist()
-        cols = ["Name","Month","Year"] + Proyectos
-        row = [Name, Month, Year] + Total_Hours
-        beta = pd.DataFrame([row], columns=cols)
-        if "TOTAL" in beta.columns:
-            beta = beta.drop(columns=["TOTAL"])
-        beta = beta.groupby(beta.columns, axis=1).sum()
-        Alfa = pd.concat([Alfa, beta], ignore_index=True, sort=False)
-        Alfa.fillna(0,inplace=True)
+    Alfa = builder.frame()
 
     # Total_HH
     Total_HH = Alfa.loc[:, ["Name","Month","Year"]].copy()
-    Total_HH["Horas Realizadas"] = Alfa.loc[:, Alfa.columns.difference(["Name","Month","Year"])].sum(axis=1).round(2)
+    # Horas Realizadas y Omega (por Name, Year) en una sola pasada agrupada, ver agregacion.consolidate
+    realizadas, Omega, _ = consolidate(Alfa)
+    Total_HH["Horas Realizadas"] = np.round(realizadas, 2)
 
     # Horas objetivo
-    Whours = []
-    for _, row in Total_HH.iterrows():
-        Year = int(row["Year"])
-        Month = int(row["Month"])
-        start = datetime.date(year=Year, month=Month, day=1)
-        if Month < 12:
-            end = datetime.date(year=Year, month=(Month+1), day=1)
-        else:
-            end = datetime.date(year=Year+1, month=1, day=1)
-        Workdays = np.busday_count(start,end)
-        hol_row = holidays_freq[(holidays_freq["Year"]==Year)&(holidays_freq["Month"]==Month)]
-        Holydays = int(hol_row["Holidays"].iloc[0]) if not hol_row.empty else 0
-        Whours.append(8*(Workdays-Holydays))
-    Total_HH["Horas objetivo*"] = np.round(Whours,2)
-
-    # Omega
-    Omega = Alfa.copy()
-    Omega["Aux"] = Omega["Name"].astype(str) + Omega["Year"].astype(str)
-    Omega = Omega.drop(columns=["Name","Year","Month"], errors='ignore')
-    Omega = Omega.groupby("Aux", as_index=False).sum()
-    Omega.insert(0,"Name",Omega["Aux"].str[:-4])
-    Omega.insert(1,"Year",Omega["Aux"].str[-4:])
-    Omega["Year"] = pd.to_numeric(Omega["Year"], errors='coerce').fillna(0).astype(int)
-    Omega = Omega.drop(columns=["Aux"], errors='ignore')
-    Omega.reset_index(drop=True,inplace=True)
+    Total_HH["Horas objetivo*"] = np.round(calendar.target_hours(Total_HH["Year"], Total_HH["Month"], Total_HH["Name"]), 2)
 
     return Alfa, Total_HH, Omega, all_errors
 
@@ -255,11 +171,14 @@ def main_process(log_ui):
         log_ui.set_status("Cargando feriados...")
         current_year = datetime.date.today().year
         holidays = fetch_holidays_chile(years=[current_year,current_year+1])
-        holidays_freq = working_holidays_frequency(holidays)
+        employees = EmployeeCalendar.load()
+        calendar = WorkCalendar(holidays, employees=employees)
+        if employees is not None:
+            log_ui.log(f"Calendario por persona: {len(employees)} persona(s) con jornada/ausencias propias.")
         log_ui.log("Feriados cargados.")
 
         log_ui.set_status("Analizando archivos...")
-        Alfa, Total_HH, Omega, errors = analyze(selected_files, holidays_freq, log_ui)
+        Alfa, Total_HH, Omega, errors = analyze(selected_files, calendar, log_ui)
 
         if errors:
             log_ui.log(f"\nSe detectaron {len(errors)} errores de formato:")
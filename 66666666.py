@@ -12,34 +12,14 @@ import tkinter as tk
 from tkinter import ttk
 from tkinter.filedialog import askopenfilenames, asksaveasfilename
 from tkinter.messagebox import showinfo, askyesno
-from dateutil.parser import parse
-import requests, certifi
+from planillas import extract_planilla
+from duplicados import collapse_copies
+from feriados import fetch_holidays_chile
+from objetivos import WorkCalendar, EmployeeCalendar
+from agregacion import HoursBuilder, consolidate
 import shutil
 
 # ---------------- utilidades de feriados ----------------
-def fetch_holidays_chile(years=None):
-    if years is None:
-        years = [datetime.date.today().year]
-    url_primary = "https://apis.digital.gob.cl/fl/feriados"
-    try:
-        resp = requests.get(url_primary, headers={"User-Agent":"My User Agent 1.0"}, verify=certifi.where(), timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        fechas = [parse(d["fecha"]).date() for d in data]
-        return pd.DataFrame({"fecha": fechas})
-    except Exception:
-        all_dates = []
-        for y in years:
-            try:
-                url = f"https://date.nager.at/api/v3/PublicHolidays/{y}/CL"
-                r = requests.get(url, timeout=10)
-                r.raise_for_status()
-                js = r.json()
-                all_dates.extend([parse(i["date"]).date() for i in js])
-            except Exception:
-                continue
-        return pd.DataFrame({"fecha": all_dates})
-
 def working_holidays_frequency(holidays_df):
     if holidays_df.empty:
         return pd.DataFrame(columns=["Year","Month","Holidays"])
@@ -215,119 +195,99 @@ def a1_notation(row, col):
 def inspect_sheet_for_errors(path: Path):
     errors = []
     try:
-        df = pd.read_excel(path, engine="openpyxl")
+        rec = extract_planilla(path)
     except Exception as e:
         errors.append(f"{path.name}: Error al abrir archivo: {e}")
         return None, errors
 
     try:
-        month_number(df.iloc[1,3])
+        month_number(rec.month_raw)
     except Exception as e:
         errors.append(f"{path.name}: error en celda {a1_notation(1,3)} -> {e}")
 
     try:
-        int(df.iloc[1,11])
+        int(rec.year_raw)
     except Exception as e:
         errors.append(f"{path.name}: error en celda {a1_notation(1,11)} -> {e}")
 
     if errors:
         return None, errors
-    return df, []
+    return rec, []
 
 # ---------------- análisis principal ----------------
-def analyze(selected_files, holidays_freq, log_ui):
-    valid_links = []
-    dfs = []
-    all_errors = []
+def inspect_files(selected_files, log_ui):
+    """Extrae y valida cada planilla una sola vez; el resultado lo comparten main_process() y analyze()."""
+    valid_links, records, all_errors = [], [], []
 
+    selected_files = collapse_copies(selected_files, log_ui.log)
     for p in selected_files:
         log_ui.log(f"Inspeccionando: {p.name}")
-        df, errors = inspect_sheet_for_errors(p)
+        rec, errors = inspect_sheet_for_errors(p)
         if errors:
             all_errors.extend(errors)
             for e in errors:
                 log_ui.log(f"  - {e}")
-        if df is not None:
+        if rec is not None:
             valid_links.append(p)
-            dfs.append(df)
+            records.append(rec)
             log_ui.log(f"  → Archivo válido: {p.name}")
         else:
             log_ui.log(f"  → Archivo omitido: {p.name}")
+    return valid_links, records, all_errors
+
+def analyze(inspected, calendar, log_ui):
+    valid_links, records, all_errors = inspected
 
     if not valid_links:
         return None, None, None, all_errors
 
-    Rg = pd.DataFrame()
+    # Rg se acumula en arreglos y se materializa una sola vez; dict(zip(...)) conserva la
+    # semántica anterior (si un proyecto se repite en la fila, vale la última celda; TOTAL se mantiene)
+    builder = HoursBuilder(sort_row_projects=False, excluded=())
     for idx, p in enumerate(valid_links):
-        df = dfs[idx]
+        rec = records[idx]
         try:
-            Name = df.columns[4]
-            Month = month_number(df.iloc[1,3])
-            Year = int(df.iloc[1,11])
-            Proyectos = df.iloc[3, 15:34].reset_index(drop=True).tolist()
-            Total_Hours = df.iloc[37, 15:34].reset_index(drop=True).tolist()
-            cols = ["Name","Month","Year"] + Proyectos
-            row = [Name, Month, Year] + Total_Hours
-            Rg = pd.concat([Rg, pd.DataFrame([dict(zip(cols,row))])], ignore_index=True)
+            Month = month_number(rec.month_raw)
+            Year = int(rec.year_raw)
+            row_dict = dict(zip(rec.projects, rec.totals))
+            builder.add(rec.name, Month, Year, list(row_dict), list(row_dict.values()))
         except Exception as e:
             log_ui.log(f"Error procesando {p.name}: {e}")
+    Rg = builder.frame()
 
-    # Agrupar sumando columnas numéricas; mantener solo columnas con nombre
+    # Agrupar sumando columnas numéricas (HoursBuilder ya descarta las columnas sin nombre)
     if Rg.empty:
         return None, None, None, all_errors
 
-    # eliminar columnas sin nombre (None o "")
-    Rg = Rg.loc[:, Rg.columns.notna()]
-    Rg = Rg.loc[:, Rg.columns != ""]
-
     Alfa = Rg.groupby(["Name","Month","Year"], as_index=False).sum(numeric_only=True)
     Total_HH = Alfa.loc[:, ["Name","Month","Year"]].copy()
-    Total_HH["Horas Realizadas"] = Alfa.loc[:, Alfa.columns.difference(["Name","Month","Year"])].sum(axis=1).round(2)
-
-    Whours = []
-    for _, row in Total_HH.iterrows():
-        Year, Month = int(row["Year"]), int(row["Month"])
-        start = datetime.date(Year, Month, 1)
-        end = datetime.date(Year + (Month==12), Month % 12 + 1, 1)
-        Workdays = np.busday_count(start,end)
-        hol_row = holidays_freq[(holidays_freq["Year"]==Year)&(holidays_freq["Month"]==Month)]
-        Holydays = int(hol_row["Holidays"].iloc[0]) if not hol_row.empty else 0
-        Whours.append(8*(Workdays-Holydays))
-    Total_HH["Horas objetivo*"] = np.round(Whours,2)
-
-    Omega = Alfa.copy()
-    Omega["Aux"] = Omega["Name"].astype(str) + Omega["Year"].astype(str)
-    Omega = Omega.drop(columns=["Name","Year","Month"], errors='ignore')
-    Omega = Omega.groupby("Aux", as_index=False).sum()
-    Omega.insert(0,"Name",Omega["Aux"].str[:-4])
-    Omega.insert(1,"Year",Omega["Aux"].str[-4:])
-    Omega["Year"] = pd.to_numeric(Omega["Year"], errors='coerce').fillna(0).astype(int)
-    Omega = Omega.drop(columns=["Aux"], errors='ignore')
-
-    # limpiar columnas vacías en Omega también
-    Omega = Omega.loc[:, Omega.columns.notna()]
-    Omega = Omega.loc[:, Omega.columns != ""]
+    # Horas Realizadas y Omega (por Name, Year) en una sola pasada agrupada, ver agregacion.consolidate
+    realizadas, Omega, _ = consolidate(Alfa)
+    Total_HH["Horas Realizadas"] = np.round(realizadas, 2)
+
+    Total_HH["Horas objetivo*"] = np.round(calendar.target_hours(Total_HH["Year"], Total_HH["Month"], Total_HH["Name"]), 2)
 
     return Alfa, Total_HH, Omega, all_errors
 
 # ---------------- proceso principal con UI ----------------
 def main_process(log_ui, selected_files):
     try:
+        log_ui.set_status("Inspeccionando archivos...")
+        inspected = inspect_files(selected_files, log_ui)
+
         log_ui.set_status("Cargando feriados...")
         # Determinar años a consultar a partir de los archivos (ignorando archivos corruptos)
-        years = set()
-        for f in selected_files:
-            try:
-                yy = int(pd.read_excel(f, engine="openpyxl").iloc[1,11])
-                years.add(yy)
-            except Exception:
-                continue
+        years = {int(rec.year_raw) for rec in inspected[1]}
         if not years:
             years = {datetime.date.today().year}
         years = sorted(years)
 
         holidays = fetch_holidays_chile(years)
         holidays_freq = working_holidays_frequency(holidays)
+        employees = EmployeeCalendar.load()
+        calendar = WorkCalendar(holidays, employees=employees)
+        if employees is not None:
+            log_ui.log(f"Calendario por persona: {len(employees)} persona(s) con jornada/ausencias propias.")
         log_ui.log("Feriados cargados correctamente.\n")
 
         for y in years:
@@ -340,7 +300,7 @@ def main_process(log_ui, selected_files):
             log_ui.log("")
 
         log_ui.set_status("Analizando archivos...")
-        Alfa, Total_HH, Omega, errors = analyze(selected_files, holidays_freq, log_ui)
+        Alfa, Total_HH, Omega, errors = analyze(inspected, calendar, log_ui)
 
         if errors:
             log_ui.log(f"\n⚠️ {len(errors)} error(es) detectado(s):")
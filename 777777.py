@@ -12,33 +12,16 @@ import tkinter as tk
 from tkinter import ttk
 from tkinter.filedialog import askopenfilenames, asksaveasfilename, askdirectory
 from tkinter.messagebox import showinfo, askyesno
-from dateutil.parser import parse
-import requests, certifi
+from planillas import extract_planilla
+from feriados import fetch_holidays_chile
+from objetivos import WorkCalendar, EmployeeCalendar
+from ingesta import ingest
+from cache_planillas import PlanillaCache, CACHE_FILE
+from agregacion import HoursBuilder
+from busqueda import find_planillas
+from duplicados import collapse_copies
 
 # ---------------- utilidades de feriados ----------------
-def fetch_holidays_chile(years=None):
-    if years is None:
-        years = [datetime.date.today().year]
-    url_primary = "https://apis.digital.gob.cl/fl/feriados"
-    try:
-        resp = requests.get(url_primary, headers={"User-Agent":"My User Agent 1.0"}, verify=certifi.where(), timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        fechas = [parse(d["fecha"]).date() for d in data]
-        return pd.DataFrame({"fecha": fechas})
-    except Exception:
-        all_dates = []
-        for y in years:
-            try:
-                url = f"https://date.nager.at/api/v3/PublicHolidays/{y}/CL"
-                r = requests.get(url, timeout=10)
-                r.raise_for_status()
-                js = r.json()
-                all_dates.extend([parse(i["date"]).date() for i in js])
-            except Exception:
-                continue
-        return pd.DataFrame({"fecha": all_dates})
-
 def working_holidays_frequency(holidays_df):
     if holidays_df.empty:
         return pd.DataFrame(columns=["Year","Month","Holidays"])
@@ -148,12 +131,8 @@ class LogWindow(tk.Tk):
         return result.get()
 
     def find_excel_in_folder(self, folder):
-        excel_files = []
-        for root, _, files in os.walk(folder):
-            for f in files:
-                if f.lower().endswith(".xlsx"):
-                    excel_files.append(Path(root)/f)
-        return excel_files
+        # omite archivos de bloqueo (~$*.xlsx) y reportes generados (Resumen.xlsx, ...)
+        return find_planillas(folder, workers=DISCOVERY_WORKERS)
 
     def load_new_files(self):
         self.selected_files.clear()
@@ -210,7 +189,8 @@ class LogWindow(tk.Tk):
             self.log("Exportación cancelada.")
             return
         try:
-            Omega_clean = self.Omega.loc[:, self.Omega.columns.notna()]
+            Omega_df = self.Omega.to_frame()
+            Omega_clean = Omega_df.loc[:, Omega_df.columns.notna()]
             Omega_clean = Omega_clean.loc[:, Omega_clean.columns != ""]
 
             with pd.ExcelWriter(dest, engine="openpyxl") as writer:
@@ -232,6 +212,11 @@ class LogWindow(tk.Tk):
             showinfo("Error", f"No fue posible exportar: {e}")
 
 # ---------------- funciones auxiliares ----------------
+# Procesos para la inspección de planillas: None = automático según CPU y tamaño total, 1 = en serie
+INGEST_WORKERS = None
+# Hilos para recorrer en paralelo las subcarpetas de la carpeta elegida (útil en unidades de red)
+DISCOVERY_WORKERS = 4
+
 def a1_notation(row, col):
     letters = ''
     while col >= 0:
@@ -242,107 +227,101 @@ def a1_notation(row, col):
 def inspect_sheet_for_errors(path: Path):
     errors = []
     try:
-        df = pd.read_excel(path, engine="openpyxl")
+        rec = extract_planilla(path)
     except Exception as e:
         errors.append(f"{path.name}: Error al abrir archivo: {e}")
         return None, errors
     try:
-        month_number(df.iloc[1,3])
+        month_number(rec.month_raw)
     except Exception as e:
         errors.append(f"{path.name}: error en celda {a1_notation(1,3)} -> {e}")
     try:
-        int(df.iloc[1,11])
+        int(rec.year_raw)
     except Exception as e:
         errors.append(f"{path.name}: error en celda {a1_notation(1,11)} -> {e}")
-    return (df if not errors else None), errors
+    return (rec if not errors else None), errors
 
 # ---------------- análisis ----------------
-def analyze(selected_files, holidays_freq, log_ui):
-    valid_links, dfs, all_errors = [], [], []
+def inspection_failed(path: Path, exc):
+    return None, [f"{path.name}: Error al abrir archivo: {exc}"]
+
+def inspect_files(selected_files, log_ui, workers=INGEST_WORKERS, cache=None):
+    """Extrae y valida cada planilla una sola vez; el resultado lo comparten main_process() y analyze()."""
+    valid_links, records, all_errors = [], [], []
 
-    for p in selected_files:
+    selected_files = collapse_copies(selected_files, log_ui.log)
+    results = ingest(selected_files, inspect_sheet_for_errors, inspection_failed, workers=workers, cache=cache)
+    for p, rec, errors in results:
         log_ui.log(f"Inspeccionando: {p.name}")
-        df, errors = inspect_sheet_for_errors(p)
         if errors:
             all_errors.extend(errors)
             for e in errors:
                 log_ui.log(f"  - {e}")
-        if df is not None:
+        if rec is not None:
             valid_links.append(p)
-            dfs.append(df)
+            records.append(rec)
             log_ui.log(f"  → Archivo válido: {p.name}")
         else:
             log_ui.log(f"  → Archivo omitido: {p.name}")
+    return valid_links, records, all_errors
+
+def analyze(inspected, calendar, log_ui):
+    valid_links, records, all_errors = inspected
 
     if not valid_links:
         return None, None, None, all_errors
 
-    Rg = pd.DataFrame()
+    # Rg se acumula en arreglos y se materializa una sola vez; dict(zip(...)) conserva la
+    # semántica anterior (si un proyecto se repite en la fila, vale la última celda; TOTAL se mantiene)
+    builder = HoursBuilder(sort_row_projects=False, excluded=())
     for idx, p in enumerate(valid_links):
-        df = dfs[idx]
+        rec = records[idx]
         try:
-            Name = df.columns[4]
-            Month = month_number(df.iloc[1,3])
-            Year = int(df.iloc[1,11])
-            Proyectos = df.iloc[3,15:34].reset_index(drop=True).tolist()
-            Total_Hours = df.iloc[37,15:34].reset_index(drop=True).tolist()
-            cols = ["Name","Month","Year"] + Proyectos
-            row = [Name, Month, Year] + Total_Hours
-            Rg = pd.concat([Rg, pd.DataFrame([dict(zip(cols,row))])], ignore_index=True)
+            Month = month_number(rec.month_raw)
+            Year = int(rec.year_raw)
+            row_dict = dict(zip(rec.projects, rec.totals))
+            builder.add(rec.name, Month, Year, list(row_dict), list(row_dict.values()))
         except Exception as e:
             log_ui.log(f"Error procesando {p.name}: {e}")
 
-    if Rg.empty:
+    if not len(builder):
         return None, None, None, all_errors
 
-    Rg = Rg.loc[:, Rg.columns.notna()]
-    Rg = Rg.loc[:, Rg.columns != ""]
-
-    Alfa = Rg.groupby(["Name","Month","Year"], as_index=False).sum(numeric_only=True)
-    Total_HH = Alfa.loc[:, ["Name","Month","Year"]].copy()
-    Total_HH["Horas Realizadas"] = Alfa.loc[:, Alfa.columns.difference(["Name","Month","Year"])].sum(axis=1).round(2)
-
-    Whours = []
-    for _, row in Total_HH.iterrows():
-        Year, Month = int(row["Year"]), int(row["Month"])
-        start = datetime.date(Year, Month, 1)
-        end = datetime.date(Year + (Month==12), Month % 12 + 1, 1)
-        Workdays = np.busday_count(start,end)
-        hol_row = holidays_freq[(holidays_freq["Year"]==Year)&(holidays_freq["Month"]==Month)]
-        Holydays = int(hol_row["Holidays"].iloc[0]) if not hol_row.empty else 0
-        Whours.append(8*(Workdays-Holydays))
-    Total_HH["Horas objetivo*"] = np.round(Whours,2)
-
-    Omega = Alfa.copy()
-    Omega["Aux"] = Omega["Name"].astype(str) + Omega["Year"].astype(str)
-    Omega = Omega.drop(columns=["Name","Year","Month"], errors='ignore')
-    Omega = Omega.groupby("Aux", as_index=False).sum()
-    Omega.insert(0,"Name",Omega["Aux"].str[:-4])
-    Omega.insert(1,"Year",Omega["Aux"].str[-4:])
-    Omega["Year"] = pd.to_numeric(Omega["Year"], errors='coerce').fillna(0).astype(int)
-    Omega = Omega.drop(columns=["Aux"], errors='ignore')
-    Omega = Omega.loc[:, Omega.columns.notna()]
-    Omega = Omega.loc[:, Omega.columns != ""]
+    # Alfa y Omega quedan como matrices dispersas persona x proyecto; se densifican al exportar
+    Alfa = builder.sparse().group_by(["Name","Month","Year"])
+    Total_HH = Alfa.keys.copy()
+    Total_HH["Horas Realizadas"] = np.round(Alfa.row_totals(), 2)
+
+    Total_HH["Horas objetivo*"] = np.round(calendar.target_hours(Total_HH["Year"], Total_HH["Month"], Total_HH["Name"]), 2)
+
+    Omega = Alfa.group_by(["Name","Year"])
 
     return Alfa, Total_HH, Omega, all_errors
 
 # ---------------- proceso principal ----------------
 def main_process(log_ui, selected_files):
     try:
+        log_ui.set_status("Inspeccionando archivos...")
+        cache = PlanillaCache(Path.cwd() / CACHE_FILE, namespace="777777")
+        try:
+            inspected = inspect_files(selected_files, log_ui, cache=cache)
+            if cache.hits:
+                log_ui.log(f"♻️ {cache.hits} archivo(s) sin cambios tomados del caché.")
+        finally:
+            cache.close()
+
         log_ui.set_status("Cargando feriados...")
-        years = set()
-        for f in selected_files:
-            try:
-                yy = int(pd.read_excel(f, engine="openpyxl").iloc[1,11])
-                years.add(yy)
-            except Exception:
-                continue
+        years = {int(rec.year_raw) for rec in inspected[1]}
         if not years:
             years = {datetime.date.today().year}
         years = sorted(years)
 
         holidays = fetch_holidays_chile(years)
         holidays_freq = working_holidays_frequency(holidays)
+        employees = EmployeeCalendar.load()
+        calendar = WorkCalendar(holidays, employees=employees)
+        if employees is not None:
+            log_ui.log(f"Calendario por persona: {len(employees)} persona(s) con jornada/ausencias propias.")
         log_ui.log("Feriados cargados correctamente.\n")
 
         for y in years:
@@ -355,7 +334,7 @@ def main_process(log_ui, selected_files):
             log_ui.log("")
 
         log_ui.set_status("Analizando archivos...")
-        Alfa, Total_HH, Omega, errors = analyze(selected_files, holidays_freq, log_ui)
+        Alfa, Total_HH, Omega, errors = analyze(inspected, calendar, log_ui)
 
         if errors:
             log_ui.log(f"\n⚠️ {len(errors)} error(es) detectado(s):")
@@ -9,6 +9,7 @@ from dateutil.parser import parse
 import datetime, numpy as np, os, pandas as pd, tkinter as tk
 from tkinter import messagebox
 from tkinter.messagebox import askyesno
+from planillas import extract_planilla, GUIDE_TEXT
 try:
     url = "https://apis.digital.gob.cl/fl/feriados"
     headers = requests.utils.default_headers()
@@ -26,6 +27,15 @@ try:
     frecuency = Data1.groupby(["Year", "Month"]).size()
     frecuency = frecuency.to_frame()
     frecuency.reset_index(inplace=True)
+    registros = {}
+
+    def leer_planilla(link):
+        # cada planilla se lee una sola vez (sólo encabezado, proyectos y totales, no la hoja
+        # completa) y el registro compacto se reutiliza en verificacion y en ambas pasadas
+        if link not in registros:
+            registros[link] = extract_planilla(link)
+        return registros[link]
+
     links = []
     for root, dirs, files in os.walk(os.getcwd()):
         for file in files:
@@ -38,8 +48,8 @@ try:
         def verificacion(links):
             errorlinks = []
             for i in links:
-                VerData = pd.read_excel((i.encode("unicode_escape").decode()), engine="openpyxl")
-                if VerData.iloc[(1, 15)] != "D E S G L O S E    P O R    P R O Y E C T O":
+                VerData = leer_planilla(i)
+                if VerData.guide != GUIDE_TEXT:
                     errorlinks.append(i)
                     continue
                 return errorlinks
@@ -119,16 +129,16 @@ try:
             else:
                 Rg = pd.DataFrame()
                 for i in range(len(links)):
-                    Data = pd.read_excel((links[i].encode("unicode_escape").decode()), engine="openpyxl")
-                    Name = Data.columns[4]
-                    Month = Data.iloc[1][3]
+                    Data = leer_planilla(links[i])
+                    Name = Data.name
+                    Month = Data.month_raw
                     print(Month)
                     Month = Month_number(Month)
-                    Year = Data.iloc[1][11]
+                    Year = Data.year_raw
                     link = links[i]
                     print(i)
-                    Proyectos = Data.iloc[3, 15:34].reset_index(drop=True).tolist()
-                    Total_Hours = Data.iloc[37, 15:34].reset_index(drop=True).tolist()
+                    Proyectos = list(Data.projects)
+                    Total_Hours = list(Data.totals)
                     Proyectos.insert(0, "Name")
                     Proyectos.insert(1, "Month")
                     Proyectos.insert(2, "Year")
@@ -196,13 +206,13 @@ try:
                     Alfa = pd.DataFrame()
                     Whours = []
                     for i in range(len(links)):
-                        Data = pd.read_excel((links[i].encode("unicode_escape").decode()), engine="openpyxl")
-                        Name = Data.columns[4]
-                        Month = Data.iloc[1][3]
+                        Data = leer_planilla(links[i])
+                        Name = Data.name
+                        Month = Data.month_raw
                         Month = Month_number(Month)
-                        Year = Data.iloc[1][11]
-                        Proyectos = Data.iloc[3, 15:34].reset_index(drop=True).tolist()
-                        Total_Hours = Data.iloc[37, 15:34].reset_index(drop=True).tolist()
+                        Year = Data.year_raw
+                        Proyectos = list(Data.projects)
+                        Total_Hours = list(Data.totals)
                         Proyectos.insert(0, "Name")
                         Proyectos.insert(1, "Month")
                         Proyectos.insert(2, "Year")
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Acumulación columnar de horas por planilla.
+Reemplaza el patrón pd.concat + fillna(0) dentro del loop (cuadrático en la cantidad
+de archivos): los nombres de proyecto se internan a ids de columna y las horas se
+agregan a arreglos NumPy preasignados; Alfa/Rg se materializan una sola vez al final.
+consolidate() arma Horas Realizadas, Omega y Suma desde Alfa en una sola pasada agrupada.
+"""
+import math
+import numpy as np
+import pandas as pd
+
+# Columnas que nunca se tratan como proyecto
+EXCLUDED_PROJECTS = ("TOTAL",)
+
+def _is_missing(name):
+    if name is None or name == "":
+        return True
+    return isinstance(name, float) and math.isnan(name)
+
+def _to_hours(value):
+    # NaN / vacío / texto -> 0, igual que el fillna(0) del código anterior
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if math.isnan(value) else value
+
+class HoursBuilder:
+    """
+    Acumula filas (Name, Month, Year, {proyecto: horas}).
+    sort_row_projects=True reproduce el orden de columnas de beta.groupby(beta.columns, axis=1):
+    los proyectos de cada fila se internan ordenados.
+    excluded: nombres de columna que se descartan (por defecto "TOTAL").
+    """
+    def __init__(self, sort_row_projects=True, excluded=EXCLUDED_PROJECTS, capacity=1024):
+        self.sort_row_projects = sort_row_projects
+        self.excluded = set(excluded)
+        self.project_ids = {}
+        self.project_names = []
+        self.names, self.months, self.years, self.links = [], [], [], []
+        self._rows = np.empty(capacity, dtype=np.int32)
+        self._cols = np.empty(capacity, dtype=np.int32)
+        self._vals = np.empty(capacity, dtype=np.float64)
+        self._n = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, project):
+        pid = self.project_ids.get(project)
+        if pid is None:
+            pid = len(self.project_names)
+            self.project_ids[project] = pid
+            self.project_names.append(project)
+        return pid
+
+    def _reserve(self, extra):
+        needed = self._n + extra
+        if needed <= len(self._vals):
+            return
+        cap = max(needed, 2 * len(self._vals))
+        self._rows = np.resize(self._rows, cap)
+        self._cols = np.resize(self._cols, cap)
+        self._vals = np.resize(self._vals, cap)
+
+    def add(self, name, month, year, projects, hours, link=None):
+        """Agrega una planilla; proyectos repetidos en la misma fila se suman. Devuelve el índice de fila."""
+        pairs = [(p, h) for p, h in zip(projects, hours)
+                 if not _is_missing(p) and p not in self.excluded]
+        if self.sort_row_projects:
+            try:
+                order = sorted({p for p, _ in pairs})
+            except TypeError:
+                order = list(dict.fromkeys(p for p, _ in pairs))
+            for p in order:
+                self.intern(p)
+
+        row = len(self.names)
+        self._reserve(len(pairs))
+        for p, h in pairs:
+            self._rows[self._n] = row
+            self._cols[self._n] = self.intern(p)
+            self._vals[self._n] = _to_hours(h)
+            self._n += 1
+        self.names.append(name)
+        self.months.append(month)
+        self.years.append(year)
+        self.links.append(link)
+        return row
+
+    def cells(self):
+        """(filas, columnas, horas) de cada celda agregada; las repetidas de una fila no se suman."""
+        return self._rows[:self._n], self._cols[:self._n], self._vals[:self._n]
+
+    def matrix(self):
+        """Matriz densa filas x proyectos (suma los proyectos repetidos de una misma fila)."""
+        dense = np.zeros((len(self.names), len(self.project_names)), dtype=np.float64)
+        rows, cols, vals = self.cells()
+        np.add.at(dense, (rows, cols), vals)
+        return dense
+
+    def frame(self, with_links=False):
+        """DataFrame Name, Month, Year, <proyectos...> [, Links] materializado una sola vez."""
+        keys = pd.DataFrame({"Name": self.names, "Month": self.months, "Year": self.years})
+        hours = pd.DataFrame(self.matrix(), columns=self.project_names)
+        parts = [keys, hours]
+        if with_links:
+            parts.append(pd.DataFrame({"Links": self.links}))
+        return pd.concat(parts, axis=1)
+
+    def sparse(self):
+        """Misma información que frame() pero como SparseHours (sin densificar)."""
+        keys = pd.DataFrame({"Name": self.names, "Month": self.months, "Year": self.years})
+        return SparseHours.from_triplets(keys, *self.cells(), self.project_names)
+
+# ---------------- matriz dispersa persona x proyecto ----------------
+class SparseHours:
+    """
+    Horas en formato CSR: una fila por clave (Name, Month, Year, ...) y una columna por proyecto.
+    Cada persona carga a lo más 19 proyectos (P:AH) de un catálogo de miles, por lo que sólo
+    se guardan las celdas no nulas; se densifica únicamente al exportar (to_frame()).
+    """
+    def __init__(self, keys, indptr, indices, data, project_names):
+        self.keys = keys.reset_index(drop=True)
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.project_names = list(project_names)
+
+    @classmethod
+    def from_triplets(cls, keys, rows, cols, vals, project_names):
+        """Construye la CSR ordenando por (fila, columna) y sumando las celdas repetidas."""
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        vals = np.asarray(vals, dtype=np.float64)
+        order = np.lexsort((cols, rows))
+        rows, cols, vals = rows[order], cols[order], vals[order]
+        if len(rows):
+            starts = np.ones(len(rows), dtype=bool)
+            starts[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+            idx = np.flatnonzero(starts)
+            vals = np.add.reduceat(vals, idx)
+            rows, cols = rows[idx], cols[idx]
+        n_rows = len(keys)
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+        return cls(keys, indptr, cols, vals, project_names)
+
+    @property
+    def shape(self):
+        return len(self.keys), len(self.project_names)
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    def row_ids(self):
+        return np.repeat(np.arange(len(self.keys)), np.diff(self.indptr))
+
+    def group_by(self, columns):
+        """
+        Suma las filas que comparten las claves indicadas (p.ej. ["Name","Year"] para Omega).
+        El orden de los grupos y el descarte de claves nulas son los de DataFrame.groupby.
+        """
+        columns = list(columns)
+        codes = self.keys.groupby(columns, sort=True).ngroup()
+        codes = codes.fillna(-1).to_numpy(dtype=np.int64)
+        n_groups = int(codes.max()) + 1 if len(codes) else 0
+        first = np.full(n_groups, -1, dtype=np.int64)
+        valid = np.flatnonzero(codes >= 0)
+        first[codes[valid][::-1]] = valid[::-1]
+        new_keys = self.keys.loc[first, columns] if n_groups else self.keys.loc[[], columns]
+        rows = codes[self.row_ids()]
+        keep = rows >= 0
+        return SparseHours.from_triplets(new_keys, rows[keep], self.indices[keep], self.data[keep],
+                                         self.project_names)
+
+    def row_totals(self):
+        """Horas por fila (Horas Realizadas)."""
+        return np.bincount(self.row_ids(), weights=self.data, minlength=len(self.keys))
+
+    def column_totals(self):
+        """Horas por proyecto (Suma)."""
+        return np.bincount(self.indices, weights=self.data, minlength=len(self.project_names))
+
+    def to_frame(self):
+        """Claves + una columna por proyecto; sólo para exportar la hoja ancha."""
+        dense = np.zeros(self.shape, dtype=np.float64)
+        dense[self.row_ids(), self.indices] = self.data
+        hours = pd.DataFrame(dense, columns=self.project_names)
+        return pd.concat([self.keys, hours], axis=1)
+
+# ---------------- consolidación (Total_HH, Omega, Suma) ----------------
+KEY_COLUMNS = ("Name", "Month", "Year")
+# Claves que se agrupan como enteros (igual que el pd.to_numeric(...).fillna(0) anterior)
+INT_KEYS = ("Month", "Year")
+
+def _key_codes(values, integer):
+    """(códigos, únicos) ordenados; los nulos forman un grupo más en vez de descartarse."""
+    if integer:
+        values = pd.to_numeric(values, errors="coerce").fillna(0).astype(np.int64)
+    try:
+        return pd.factorize(values, sort=True, use_na_sentinel=False)
+    except TypeError:
+        # tipos mezclados (p.ej. un nombre escrito como número): orden de aparición
+        return pd.factorize(values, sort=False, use_na_sentinel=False)
+
+def group_index(frame, by):
+    """
+    Grupos de las columnas by con códigos enteros por clave. Devuelve (inverse, claves):
+    inverse[i] es el grupo de la fila i y claves tiene una fila por grupo, ordenadas por by.
+    """
+    group = np.zeros(len(frame), dtype=np.int64)
+    uniques = []
+    for col in by:
+        codes, uniq = _key_codes(frame[col], col in INT_KEYS)
+        group = group * len(uniq) + codes
+        uniques.append(np.asarray(uniq))
+    groups, inverse = np.unique(group, return_inverse=True)
+    keys = {}
+    rest = groups
+    for col, uniq in zip(reversed(by), reversed(uniques)):
+        rest, code = np.divmod(rest, len(uniq))
+        keys[col] = uniq[code]
+    return inverse, pd.DataFrame({col: keys[col] for col in by})
+
+def consolidate(Alfa, by=("Name", "Year"), keys=KEY_COLUMNS):
+    """
+    Una sola pasada agrupada sobre Alfa. Devuelve (realizadas, Omega, Suma):
+     - realizadas: horas por fila de Alfa ("Horas Realizadas" de Total_HH),
+     - Omega: by + proyectos, sumados por grupo (por defecto persona y año),
+     - Suma: total por proyecto, DataFrame con columna "Total".
+    Los grupos se arman con códigos enteros de cada clave (sin concatenar Name+Year en texto,
+    que confundía nombres terminados en dígitos) y sólo se suman las columnas numéricas
+    que no son clave.
+    """
+    by = list(by)
+    cols = [i for i, (c, dt) in enumerate(zip(Alfa.columns, Alfa.dtypes))
+            if c not in keys and c not in by and pd.api.types.is_numeric_dtype(dt)]
+    projects = Alfa.columns[cols]
+    hours = Alfa.iloc[:, cols].to_numpy(dtype=np.float64, copy=True)
+    hours[np.isnan(hours)] = 0.0           # como el skipna de DataFrame.sum
+
+    inverse, group_keys = group_index(Alfa, by)
+    order = np.argsort(inverse, kind="stable")
+    if len(order):
+        starts = np.flatnonzero(np.r_[True, np.diff(inverse[order]) != 0])
+        sums = np.add.reduceat(hours[order], starts, axis=0)
+    else:
+        sums = np.zeros((0, len(cols)), dtype=np.float64)
+
+    Omega = pd.concat([group_keys, pd.DataFrame(sums, columns=projects)], axis=1)
+    Suma = pd.DataFrame({"Total": sums.sum(axis=0)}, index=projects)
+    return hours.sum(axis=1), Omega, Suma
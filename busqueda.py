@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Búsqueda de planillas .xlsx con os.scandir.
+Descarta archivos de bloqueo de Excel (~$*.xlsx), los reportes que genera este mismo
+programa y sus archivos de configuración; acepta patrones glob de inclusión/exclusión,
+profundidad máxima y recorrido en paralelo de las carpetas hermanas del directorio raíz (útil en shares de red).
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+from pathlib import Path
+
+DEFAULT_INCLUDE = ("*.xlsx",)
+LOCK_PREFIX = "~$"
+# Reportes generados por las distintas versiones del análisis
+OUTPUT_FILES = ("Resumen.xlsx", "Errores_planillas.xlsx", "Resumen_simple.xlsx")
+# Archivos de entrada del análisis que no son planillas
+CONFIG_FILES = ("calendario_personal.xlsx",)
+
+class _Rules:
+    def __init__(self, include, exclude, max_depth, exclude_outputs):
+        self.include = [p.lower() for p in include]
+        self.exclude = [p.lower() for p in exclude]
+        self.max_depth = max_depth
+        self.outputs = {n.lower() for n in OUTPUT_FILES + CONFIG_FILES} if exclude_outputs else set()
+
+    def excluded(self, name, rel):
+        name, rel = name.lower(), rel.lower()
+        return any(fnmatch(name, p) or fnmatch(rel, p) for p in self.exclude)
+
+    def wanted_file(self, name, rel):
+        low = name.lower()
+        if low.startswith(LOCK_PREFIX) or low in self.outputs:
+            return False
+        if not any(fnmatch(low, p) for p in self.include):
+            return False
+        return not self.excluded(name, rel)
+
+def _scan_dir(path, rel, depth, rules):
+    """Devuelve (archivos, subcarpetas) de un directorio; los errores de acceso se ignoran como en os.walk."""
+    files, subdirs = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                entry_rel = f"{rel}/{entry.name}" if rel else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if (rules.max_depth is None or depth < rules.max_depth) and not rules.excluded(entry.name, entry_rel):
+                            subdirs.append((entry.path, entry_rel))
+                    elif entry.is_file() and rules.wanted_file(entry.name, entry_rel):
+                        files.append(Path(entry.path))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, subdirs
+
+def _walk(path, rel, depth, rules):
+    files, subdirs = _scan_dir(path, rel, depth, rules)
+    yield from files
+    for sub_path, sub_rel in subdirs:
+        yield from _walk(sub_path, sub_rel, depth + 1, rules)
+
+def iter_planillas(root_dir, include=DEFAULT_INCLUDE, exclude=(), max_depth=None,
+                   exclude_outputs=True, workers=1):
+    """
+    Entrega las planillas bajo root_dir (mismo orden que os.walk top-down: primero los archivos
+    de cada carpeta y luego sus subcarpetas). max_depth=0 sólo mira root_dir.
+    workers > 1 recorre en hilos las carpetas hermanas de primer nivel.
+    """
+    rules = _Rules(include, exclude, max_depth, exclude_outputs)
+    files, subdirs = _scan_dir(root_dir, "", 0, rules)
+    yield from files
+    if workers <= 1 or len(subdirs) <= 1:
+        for sub_path, sub_rel in subdirs:
+            yield from _walk(sub_path, sub_rel, 1, rules)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(lambda a: list(_walk(a[0], a[1], 1, rules)), sd) for sd in subdirs]
+        for fut in futures:
+            yield from fut.result()
+
+def find_planillas(root_dir, **kwargs):
+    return list(iter_planillas(root_dir, **kwargs))
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Caché persistente (SQLite) de planillas ya extraídas.
+Clave: ruta absoluta + tamaño + mtime + hash del contenido.
+Valor: (PlanillaRecord, errores de validación) tal como los devolvió la inspección,
+guardados como JSON (campos del registro y errores): la carpeta de trabajo suele ser
+compartida y leer el caché no debe poder ejecutar código (como sí podría pickle).
+"""
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+from pathlib import Path
+import numpy as np
+from planillas import PlanillaRecord
+
+CACHE_FILE = "planillas_cache.sqlite"
+# Subir al cambiar PlanillaRecord o las reglas de validación: invalida todas las entradas
+CACHE_VERSION = 3
+
+# ---------------- serialización ----------------
+# Valores de celda que JSON no representa: se guardan como {etiqueta: texto}
+_TAGS = {"$datetime": datetime.datetime.fromisoformat, "$date": datetime.date.fromisoformat,
+         "$time": datetime.time.fromisoformat,
+         "$timedelta": lambda seconds: datetime.timedelta(seconds=seconds)}
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"$date": value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {"$time": value.isoformat()}
+    if isinstance(value, datetime.timedelta):
+        return {"$timedelta": value.total_seconds()}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, Path):
+        return str(value)
+    raise TypeError(f"valor no serializable en el caché: {type(value).__name__}")
+
+def _decode_value(obj):
+    if len(obj) == 1:
+        tag, value = next(iter(obj.items()))
+        if tag in _TAGS:
+            return _TAGS[tag](value)
+    return obj
+
+def dump_entry(rec, errors):
+    state = None if rec is None else list(rec.__getstate__())
+    return json.dumps({"record": state, "errors": errors}, default=_encode_value, ensure_ascii=False)
+
+def load_entry(payload):
+    data = json.loads(payload, object_hook=_decode_value)
+    rec = None
+    if data["record"] is not None:
+        state = data["record"]
+        state[0] = Path(state[0])
+        rec = PlanillaRecord.__new__(PlanillaRecord)
+        rec.__setstate__(tuple(state))
+    return rec, data["errors"]
+
+def file_hash(path, chunk_size=1024 * 1024):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class PlanillaCache:
+    def __init__(self, db_path=CACHE_FILE, namespace=""):
+        """namespace distingue variantes cuyo inspect_sheet_for_errors produce errores distintos."""
+        self.db_path = Path(db_path)
+        self.namespace = f"{namespace}:{CACHE_VERSION}"
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS planillas ("
+            " path TEXT NOT NULL, namespace TEXT NOT NULL,"
+            " size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, hash TEXT NOT NULL,"
+            " payload BLOB NOT NULL,"
+            " PRIMARY KEY (path, namespace))"
+        )
+        # entradas de versiones anteriores (las hasta la 2 eran pickle): no se leen nunca
+        self.conn.execute("DELETE FROM planillas WHERE namespace NOT LIKE ?", (f"%:{CACHE_VERSION}",))
+        self.conn.commit()
+
+    @staticmethod
+    def _identity(path):
+        path = Path(path).resolve()
+        st = os.stat(path)
+        return str(path), st.st_size, st.st_mtime_ns
+
+    def get(self, path):
+        """Devuelve (rec, errors) si el archivo no cambió desde que se guardó, o None."""
+        try:
+            key, size, mtime_ns = self._identity(path)
+        except OSError:
+            return None
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, hash, payload FROM planillas WHERE path=? AND namespace=?",
+            (key, self.namespace)).fetchone()
+        if row is None or row[0] != size:
+            self.misses += 1
+            return None
+        if row[1] != mtime_ns:
+            # mismo tamaño pero tocado (copiado, re-guardado): se confirma por contenido
+            try:
+                if file_hash(path) != row[2]:
+                    self.misses += 1
+                    return None
+            except OSError:
+                return None
+            self.conn.execute("UPDATE planillas SET mtime_ns=? WHERE path=? AND namespace=?",
+                              (mtime_ns, key, self.namespace))
+        try:
+            entry = load_entry(row[3])
+        except (ValueError, TypeError, KeyError, IndexError):
+            # entrada ilegible (p.ej. editada a mano): se vuelve a abrir el archivo
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, path, rec, errors):
+        try:
+            key, size, mtime_ns = self._identity(path)
+            digest = file_hash(path)
+            payload = dump_entry(rec, errors)
+        except (OSError, TypeError):
+            return
+        self.conn.execute(
+            "INSERT OR REPLACE INTO planillas (path, namespace, size, mtime_ns, hash, payload)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (key, self.namespace, size, mtime_ns, digest, payload))
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Cubo de totales pre-agregados (SQLite), calculado una vez por corrida a partir de Alfa.
+Granos estándar, cada uno en su propia tabla con índice en el orden de sus claves:
+ - person_month:  Name, Year, Month, Project
+ - person_year:   Name, Year, Project          (Omega en formato largo)
+ - project_month: Project, Year, Month
+ - project_year:  Project, Year
+ - total:         Project                      (Suma)
+Cada grano se obtiene sumando el anterior más fino (no se vuelve a recorrer Alfa) y sólo
+se guardan las celdas con horas. query() responde desde la tabla del grano con una
+búsqueda por índice, en tiempo proporcional al tamaño del resultado, p.ej. horas por
+proyecto del primer trimestre: query("project_month", Year=2025, Month=[1, 2, 3]).
+"""
+import os
+import sqlite3
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+CUBE_FILE = "cubo_horas.sqlite"
+KEY_COLUMNS = ("Name", "Month", "Year")
+# grano -> (claves en el orden del índice, grano más fino del que se deriva)
+GRAINS = {
+    "person_month": (("Name", "Year", "Month", "Project"), None),
+    "person_year": (("Name", "Year", "Project"), "person_month"),
+    "project_month": (("Project", "Year", "Month"), "person_month"),
+    "project_year": (("Project", "Year"), "project_month"),
+    "total": (("Project",), "project_year"),
+}
+# índices adicionales para filtrar por período sin fijar persona/proyecto
+PERIOD_INDEXES = {"person_month": ("Year", "Month"), "project_month": ("Year", "Month")}
+
+def _cells(Alfa):
+    """Alfa (una columna por proyecto) -> celdas con horas: Name, Year, Month, Project, Hours."""
+    projects = [c for c in Alfa.columns if c not in KEY_COLUMNS]
+    hours = Alfa[projects].to_numpy(dtype=np.float64)
+    rows, cols = np.nonzero(np.nan_to_num(hours))
+    names = Alfa["Name"].to_numpy(dtype=object)[rows]
+    return pd.DataFrame({
+        "Name": [None if pd.isna(v) else str(v) for v in names],
+        "Year": Alfa["Year"].to_numpy(dtype=np.int64)[rows],
+        "Month": Alfa["Month"].to_numpy(dtype=np.int64)[rows],
+        # el nombre de proyecto puede ser numérico en la planilla; en el cubo siempre es texto
+        "Project": np.array([str(p) for p in projects], dtype=object)[cols],
+        "Hours": hours[rows, cols],
+    })
+
+def rollups(Alfa):
+    """{grano: DataFrame claves + Hours} para todos los granos de GRAINS."""
+    tables = {}
+    for grain, (keys, source) in GRAINS.items():
+        base = _cells(Alfa) if source is None else tables[source]
+        tables[grain] = (base.groupby(list(keys), sort=True, dropna=False, as_index=False)["Hours"].sum())
+    return tables
+
+def build_cube(Alfa, path=CUBE_FILE):
+    """Calcula todos los granos y reemplaza el cubo en path (atómicamente). Devuelve path."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    if tmp.exists():
+        tmp.unlink()
+    conn = sqlite3.connect(str(tmp))
+    try:
+        for grain, table in rollups(Alfa).items():
+            keys = GRAINS[grain][0]
+            table.to_sql(grain, conn, index=False)
+            conn.execute(f'CREATE INDEX "{grain}_keys" ON "{grain}" ({", ".join(keys)})')
+            if grain in PERIOD_INDEXES:
+                conn.execute(f'CREATE INDEX "{grain}_period" ON "{grain}" ({", ".join(PERIOD_INDEXES[grain])})')
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+    return path
+
+class HoursCube:
+    def __init__(self, path=CUBE_FILE):
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"No existe el cubo {self.path}; se genera con build_cube()")
+        self.conn = sqlite3.connect(str(self.path))
+
+    def query(self, grain, **filters):
+        """
+        Filas del grano que cumplen los filtros (columna=valor, lista de valores o None para
+        nombre vacío). Devuelve DataFrame con las claves del grano y Hours.
+        """
+        if grain not in GRAINS:
+            raise ValueError(f"Grano desconocido: {grain} (opciones: {', '.join(GRAINS)})")
+        keys = GRAINS[grain][0]
+        where, params = [], []
+        for col, value in filters.items():
+            if col not in keys:
+                raise ValueError(f"{grain} no tiene la columna {col} (claves: {', '.join(keys)})")
+            if value is None:
+                where.append(f"{col} IS NULL")
+            elif isinstance(value, (list, tuple, set, range)):
+                value = list(value)
+                where.append(f"{col} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                where.append(f"{col} = ?")
+                params.append(value)
+        sql = f'SELECT {", ".join(keys)}, Hours FROM "{grain}"'
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Detección de planillas duplicadas (misma persona, mes y año).
+Las claves se indexan como tuplas (Name, Month, Year) en un dict, sin concatenar textos
+(con "Ana1"+"12025" == "Ana11"+"2025" dos personas distintas chocaban), y las fechas de
+los archivos se leen con un os.scandir por carpeta en vez de un stat por archivo.
+
+Antes de abrir las planillas, identical_copies() descarta las copias byte a byte idénticas
+(el mismo archivo en dos carpetas o reenviado con otro nombre).
+"""
+import hashlib
+import os
+import struct
+from pathlib import Path
+from cache_planillas import file_hash
+
+def duplicate_groups(items, key):
+    """
+    Agrupa items por key(item) en una sola pasada. Devuelve sólo los grupos con más de un
+    elemento, en el orden en que aparece la primera ocurrencia de cada clave.
+    """
+    index = {}
+    for item in items:
+        index.setdefault(key(item), []).append(item)
+    return [group for group in index.values() if len(group) > 1]
+
+def file_times(paths):
+    """
+    {Path: (ctime, mtime)} leyendo cada carpeta una vez con os.scandir.
+    Los archivos que no aparecen en el listado (p.ej. ya borrados) se omiten.
+    """
+    by_dir = {}
+    for p in paths:
+        p = Path(p)
+        by_dir.setdefault(p.parent, {})[p.name] = p
+    times = {}
+    for folder, wanted in by_dir.items():
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    p = wanted.get(entry.name)
+                    if p is None:
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    times[p] = (st.st_ctime, st.st_mtime)
+        except OSError:
+            continue
+    return times
+
+def older_copies(groups, times, field=0):
+    """
+    Para cada grupo de rutas duplicadas devuelve las que no son la más reciente
+    (field=0: fecha de creación/ctime, 1: modificación). Con empate se conserva la primera.
+    """
+    to_delete = []
+    for paths in groups:
+        ordered = sorted((Path(p) for p in paths), reverse=True,
+                         key=lambda p: times.get(p, (float("-inf"),) * 2)[field])
+        to_delete.extend(ordered[1:])
+    return to_delete
+
+# ---------------- copias idénticas (antes de leer) ----------------
+_EOCD = b"PK\x05\x06"
+_EOCD_SEARCH = 65536 + 22       # comentario máximo del zip + registro EOCD
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+def _zip_directory_digest(path):
+    """
+    BLAKE2 del directorio central del .xlsx: lista cada parte con su CRC-32 y tamaños, así
+    que dos archivos distintos casi nunca coinciden aquí y no hace falta leerlos completos.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, "rb") as fh:
+            fh.seek(0, os.SEEK_END)
+            size = fh.tell()
+            tail = min(size, _EOCD_SEARCH)
+            fh.seek(size - tail)
+            data = fh.read(tail)
+            i = data.rfind(_EOCD)
+            if i < 0 or i + 22 > len(data):
+                return None
+            cd_size, cd_offset = struct.unpack("<II", data[i + 12:i + 20])
+            fh.seek(cd_offset)
+            h.update(fh.read(cd_size))
+    except OSError:
+        return None
+    return h.hexdigest()
+
+def _full_digest(path):
+    try:
+        return file_hash(path)
+    except OSError:
+        return None
+
+def identical_copies(paths):
+    """
+    Agrupa por tamaño, luego por el directorio central del zip y confirma con el BLAKE2 del
+    archivo completo. Devuelve (únicos, copias): únicos en el orden de entrada conservando la
+    primera aparición, y copias = [(original, [copias...]), ...].
+    """
+    paths = [Path(p) for p in paths]
+    copies = []
+    candidates = [group for group in duplicate_groups(paths, key=_size) if _size(group[0]) is not None]
+    for digest in (_zip_directory_digest, _full_digest):
+        narrowed = []
+        for group in candidates:
+            digests = {p: digest(p) for p in group}
+            narrowed.extend(g for g in duplicate_groups(group, key=digests.get) if digests[g[0]] is not None)
+        candidates = narrowed
+    dropped = set()
+    for group in candidates:
+        copies.append((group[0], group[1:]))
+        dropped.update(group[1:])
+    return [p for p in paths if p not in dropped], copies
+
+def iter_unique(paths, log):
+    """
+    Versión en streaming de collapse_copies(): entrega cada ruta en cuanto se sabe que no es
+    copia idéntica de una anterior (mismos criterios que identical_copies). Sólo se retienen
+    las rutas únicas ya vistas, agrupadas por tamaño, y sus digests.
+    """
+    seen = {}
+    digests = {}
+    def digest(fn, p):
+        if (fn, p) not in digests:
+            digests[(fn, p)] = fn(p)
+        return digests[(fn, p)]
+    def same(p, q):
+        for fn in (_zip_directory_digest, _full_digest):
+            d = digest(fn, p)
+            if d is None or d != digest(fn, q):
+                return False
+        return True
+    for p in paths:
+        p = Path(p)
+        size = _size(p)
+        original = None
+        if size is not None:
+            original = next((q for q in seen.get(size, ()) if same(p, q)), None)
+            if original is None:
+                seen.setdefault(size, []).append(p)
+        if original is not None:
+            log(f"⧉ Copia idéntica omitida: {p} (igual a {original.name})")
+            continue
+        yield p
+
+def collapse_copies(paths, log):
+    """identical_copies() + aviso en el log por cada copia omitida. Devuelve los únicos."""
+    unique, copies = identical_copies(paths)
+    for original, dups in copies:
+        for d in dups:
+            log(f"⧉ Copia idéntica omitida: {d} (igual a {original.name})")
+    return unique
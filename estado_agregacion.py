@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Estado persistente (SQLite) de la agregación, para no recalcular Omega/Suma desde cero.
+Guarda la fila de Alfa de cada archivo (clave Name, Month, Year y sus celdas por proyecto,
+con el tamaño y mtime del archivo) y Omega ya materializado por (Name, Year, proyecto);
+grupos (Name, Year) y proyectos se guardan una vez y se referencian por id entero.
+En cada corrida sync() sólo mira la firma (tamaño, mtime) de los archivos: los nuevos,
+cambiados o que ya no están (p.ej. eliminados por duplicado) reemplazan sus filas, y
+sólo los grupos (Name, Year) que esos archivos tocan se vuelven a sumar desde las filas
+guardadas. El costo de una corrida crece con el cambio, no con el total de archivos.
+
+Las horas se guardan como enteros (millonésimas de hora) y cada grupo tocado se suma de
+nuevo completo, de modo que no se arrastra error de punto flotante: después del redondeo
+a 2 decimales de los reportes, Omega/Suma coinciden con un recálculo completo.
+"""
+import math
+import os
+import sqlite3
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from agregacion import group_index
+
+STATE_FILE = "agregacion_estado.sqlite"
+# Subir al cambiar el contenido de las tablas: descarta el estado y se reconstruye completo
+STATE_VERSION = 2
+SCALE = 1_000_000
+# Omega se agrupa por persona y año (como consolidate() por defecto)
+BY = ("Name", "Year")
+# Sobre esta fracción de grupos tocados conviene un GROUP BY de toda la tabla
+FULL_REBUILD_RATIO = 0.5
+
+def _units(hours):
+    return int(round(hours * SCALE))
+
+def _plain(value):
+    # claves nulas de pandas (NaN) y tipos NumPy -> valores que SQLite guarda tal cual
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        # sin firma: el archivo se vuelve a guardar en cada corrida
+        return None, None
+    return st.st_size, st.st_mtime_ns
+
+class AggregateState:
+    def __init__(self, db_path=STATE_FILE):
+        self.db_path = Path(db_path)
+        self.conn = sqlite3.connect(str(self.db_path))
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != STATE_VERSION:
+            self.conn.executescript(
+                "DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS cells; DROP TABLE IF EXISTS totals;"
+                " DROP TABLE IF EXISTS omega; DROP TABLE IF EXISTS groups; DROP TABLE IF EXISTS projects;")
+        self.conn.executescript(
+            # name/project pueden ser NULL o no ser texto: se resuelven a id en Python, no con UNIQUE
+            "CREATE TABLE IF NOT EXISTS groups (gid INTEGER PRIMARY KEY, name, year);"
+            "CREATE TABLE IF NOT EXISTS projects (pid INTEGER PRIMARY KEY, project);"
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, gid INTEGER NOT NULL, month);"
+            "CREATE INDEX IF NOT EXISTS files_gid ON files (gid);"
+            "CREATE TABLE IF NOT EXISTS cells ("
+            " path TEXT NOT NULL, pid INTEGER NOT NULL, hours INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS cells_path ON cells (path);"
+            "CREATE TABLE IF NOT EXISTS omega (gid INTEGER NOT NULL, pid INTEGER NOT NULL, hours INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS omega_gid ON omega (gid);"
+            f"PRAGMA user_version = {STATE_VERSION};"
+        )
+        self.conn.commit()
+
+    # ---------------- catálogos ----------------
+    def _ids(self, table, key, values):
+        """{valor: id} de groups/projects, agregando los valores que falten."""
+        columns = "name, year" if table == "groups" else "project"
+        ids = {(row[1:] if table == "groups" else row[1]): row[0]
+               for row in self.conn.execute(f"SELECT {key}, {columns} FROM {table}")}
+        for value in values:
+            if value not in ids:
+                params = value if table == "groups" else (value,)
+                cur = self.conn.execute(
+                    f"INSERT INTO {table} ({columns}) VALUES ({', '.join('?' * len(params))})", params)
+                ids[value] = cur.lastrowid
+        return ids
+
+    # ---------------- filas por archivo ----------------
+    def _drop_files(self, paths):
+        params = [(p,) for p in paths]
+        self.conn.executemany("DELETE FROM cells WHERE path=?", params)
+        self.conn.executemany("DELETE FROM files WHERE path=?", params)
+
+    def _insert_files(self, builder, entries):
+        """entries: [(fila del builder, path, size, mtime_ns, gid)] de los archivos a guardar."""
+        self.conn.executemany(
+            "INSERT INTO files (path, size, mtime_ns, gid, month) VALUES (?, ?, ?, ?, ?)",
+            [(path, size, mtime, gid, _plain(builder.months[i])) for i, path, size, mtime, gid in entries])
+        path_of = {i: path for i, path, _, _, _ in entries}
+        rows, cols, vals = builder.cells()
+        keep = np.isin(rows, np.fromiter(path_of, dtype=np.int64, count=len(path_of)))
+        pid_of = self._ids("projects", "pid", [_plain(p) for p in builder.project_names])
+        pids = [pid_of[_plain(p)] for p in builder.project_names]
+        self.conn.executemany(
+            "INSERT INTO cells (path, pid, hours) VALUES (?, ?, ?)",
+            [(path_of[r], pids[c], _units(v))
+             for r, c, v in zip(rows[keep].tolist(), cols[keep].tolist(), vals[keep].tolist())])
+
+    # ---------------- Omega materializado ----------------
+    def _regroup(self, gids):
+        """Vuelve a sumar desde las filas guardadas sólo los grupos indicados."""
+        total = self.conn.execute("SELECT COUNT(DISTINCT gid) FROM files").fetchone()[0]
+        select = "SELECT f.gid, c.pid, SUM(c.hours) FROM files f JOIN cells c ON c.path = f.path"
+        if len(gids) > FULL_REBUILD_RATIO * max(total, 1):
+            self.conn.execute("DELETE FROM omega")
+            self.conn.execute(f"INSERT INTO omega (gid, pid, hours) {select} GROUP BY f.gid, c.pid")
+            return
+        for gid in gids:
+            self.conn.execute("DELETE FROM omega WHERE gid=?", (gid,))
+            self.conn.execute(f"INSERT INTO omega (gid, pid, hours) {select} WHERE f.gid=? GROUP BY c.pid", (gid,))
+
+    def sync(self, builder, paths):
+        """
+        Deja el estado igual a las filas del HoursBuilder (una por archivo de paths, en el mismo
+        orden). Sólo se leen del builder las filas de archivos nuevos o cambiados.
+        Devuelve (agregados, cambiados, quitados).
+        """
+        stored = {path: (size, mtime, gid) for path, size, mtime, gid
+                  in self.conn.execute("SELECT path, size, mtime_ns, gid FROM files")}
+        pending, current = [], set()
+        added = changed = 0
+        for i, p in enumerate(paths):
+            path = os.path.abspath(p)
+            current.add(path)
+            size, mtime = _signature(path)
+            old = stored.get(path)
+            if old is not None and size is not None and old[:2] == (size, mtime):
+                continue
+            if old is None:
+                added += 1
+            else:
+                changed += 1
+            pending.append((i, path, size, mtime))
+        gone = [path for path in stored if path not in current]
+        if not pending and not gone:
+            return 0, 0, 0
+
+        # grupos tocados: el anterior de cada archivo reemplazado o quitado y el nuevo de cada guardado
+        replaced = gone + [path for _, path, _, _ in pending if path in stored]
+        gids = {stored[path][2] for path in replaced}
+        keys = [(_plain(builder.names[i]), _plain(builder.years[i])) for i, _, _, _ in pending]
+        gid_of = self._ids("groups", "gid", keys)
+        entries = [(*entry, gid_of[key]) for entry, key in zip(pending, keys)]
+        gids.update(gid for *_, gid in entries)
+
+        self._drop_files(replaced)
+        if entries:
+            self._insert_files(builder, entries)
+        self._regroup(gids)
+        self.conn.commit()
+        return added, changed, len(gone)
+
+    # ---------------- salida ----------------
+    def omega(self, keys, project_names):
+        """
+        (Omega, Suma) desde Omega materializado, con las mismas filas y columnas que
+        consolidate(Alfa) para un Alfa con esas claves (keys) y proyectos.
+        """
+        _, group_keys = group_index(keys, list(BY))
+        position = {tuple(_plain(v) for v in row): g
+                    for g, row in enumerate(group_keys.itertuples(index=False, name=None))}
+        column = {_plain(p): j for j, p in enumerate(project_names)}
+        # id guardado -> fila / columna de la salida (-1: grupo o proyecto que ya no está)
+        groups = self.conn.execute("SELECT gid, name, year FROM groups").fetchall()
+        row_of = np.full(max((g for g, _, _ in groups), default=0) + 1, -1, dtype=np.int64)
+        for gid, name, year in groups:
+            row_of[gid] = position.get((name, year), -1)
+        projects = self.conn.execute("SELECT pid, project FROM projects").fetchall()
+        col_of = np.full(max((p for p, _ in projects), default=0) + 1, -1, dtype=np.int64)
+        for pid, project in projects:
+            col_of[pid] = column.get(project, -1)
+
+        dense = np.zeros((len(group_keys), len(project_names)), dtype=np.float64)
+        stored = np.array(self.conn.execute("SELECT gid, pid, hours FROM omega").fetchall(), dtype=np.int64)
+        if len(stored):
+            rows, cols = row_of[stored[:, 0]], col_of[stored[:, 1]]
+            if (rows < 0).any() or (cols < 0).any():
+                raise ValueError("El estado de agregación no corresponde a estas filas; llamar a sync() antes")
+            dense[rows, cols] = stored[:, 2] / SCALE
+        projects = pd.Index(project_names)
+        Omega = pd.concat([group_keys, pd.DataFrame(dense, columns=projects)], axis=1)
+        Suma = pd.DataFrame({"Total": dense.sum(axis=0)}, index=projects)
+        return Omega, Suma
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
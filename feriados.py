@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+Feriados de Chile con caché local (offline-first).
+Cada año se guarda por separado en feriados_cache.json junto con su ETag/Last-Modified.
+Si el año está en caché se responde de inmediato; si además está vencido (HOLIDAYS_TTL)
+se revalida en segundo plano con If-None-Match / If-Modified-Since.
+Sólo los años que nunca se han descargado bloquean la llamada.
+Las descargas van en paralelo sobre una sesión compartida: por cada año compiten la fuente
+oficial y Nager.Date, con reintentos y un plazo único (HOLIDAYS_DEADLINE) para toda la etapa.
+Los años que ninguna fuente entrega se calculan con las reglas legales (reglas_feriados) y se
+guardan como source="rules": durante HOLIDAYS_TTL no se vuelve a esperar a la red por ellos y,
+al vencer, se intenta de nuevo la descarga como con cualquier año vencido.
+"""
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+import requests, certifi
+from dateutil.parser import parse
+import pandas as pd
+from reglas_feriados import holiday_dates
+
+HOLIDAYS_FILE = "feriados_cache.json"
+HOLIDAYS_TTL = 7 * 24 * 3600          # segundos
+HOLIDAYS_CACHE_VERSION = 1
+# "auto" | "online" | "rules" (ver fetch_holidays_chile)
+HOLIDAYS_MODE = "auto"
+
+PRIMARY_URL = "https://apis.digital.gob.cl/fl/feriados/{year}"
+FALLBACK_URL = "https://date.nager.at/api/v3/PublicHolidays/{year}/CL"
+USER_AGENT = "My User Agent 1.0"
+REQUEST_TIMEOUT = 10                  # por solicitud
+HOLIDAYS_DEADLINE = 8.0               # tope para toda la descarga (todas las fuentes y años)
+RETRIES = 2
+BACKOFF = 0.25                        # segundos; se duplica en cada reintento
+POOL_SIZE = 8
+
+# ---------------- almacén local ----------------
+class HolidayStore:
+    """
+    Entradas por año: {"dates": [...iso...], "fetched": epoch, "source": "primary"|"fallback"|"rules",
+    "etag": str|None, "last_modified": str|None}. Se escribe completo y atómicamente.
+    """
+    def __init__(self, path=HOLIDAYS_FILE, ttl=HOLIDAYS_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.years = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != HOLIDAYS_CACHE_VERSION:
+            return {}
+        return data.get("years", {})
+
+    def _save(self):
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"version": HOLIDAYS_CACHE_VERSION, "years": self.years}, fh, indent=1)
+        os.replace(tmp, self.path)
+
+    def get(self, year):
+        with self.lock:
+            return self.years.get(str(year))
+
+    def is_fresh(self, entry):
+        return entry is not None and time.time() - entry.get("fetched", 0) < self.ttl
+
+    def dates(self, year):
+        entry = self.get(year)
+        if entry is None:
+            return []
+        return [datetime.date.fromisoformat(d) for d in entry["dates"]]
+
+    def put(self, year, dates, source, etag=None, last_modified=None):
+        with self.lock:
+            self.years[str(year)] = {
+                "dates": sorted(d.isoformat() for d in dates),
+                "fetched": time.time(),
+                "source": source,
+                "etag": etag,
+                "last_modified": last_modified,
+            }
+            self._save()
+
+    def touch(self, year):
+        """Respuesta 304: el contenido sigue vigente, sólo se renueva la fecha de descarga."""
+        with self.lock:
+            entry = self.years.get(str(year))
+            if entry is not None:
+                entry["fetched"] = time.time()
+                self._save()
+
+# ---------------- descarga ----------------
+def _conditional_headers(entry, source):
+    headers = {}
+    if entry is not None and entry.get("source") == source:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+def _parse_primary(js, year):
+    # el API entrega una lista de {"fecha": "YYYY-MM-DD", ...}
+    fechas = [parse(d["fecha"]).date() for d in js]
+    return [f for f in fechas if f.year == year]
+
+def _parse_fallback(js, year):
+    return [parse(i["date"]).date() for i in js]
+
+def make_sources(primary_url=PRIMARY_URL, fallback_url=FALLBACK_URL):
+    """(nombre, url con {year}, parser, kwargs extra de requests) de cada fuente; las URL se pueden apuntar a un servidor de prueba."""
+    return (
+        ("primary", primary_url, _parse_primary, {"verify": certifi.where()}),
+        ("fallback", fallback_url, _parse_fallback, {}),
+    )
+
+SOURCES = make_sources()
+
+_session = None
+_session_lock = threading.Lock()
+
+def shared_session():
+    """Sesión única con pool de conexiones (keep-alive) para todas las descargas."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=len(SOURCES), pool_maxsize=POOL_SIZE)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.headers["User-Agent"] = USER_AGENT
+            _session = s
+        return _session
+
+def _get_with_retry(session, url, headers, limit, extra):
+    """GET con reintentos (backoff exponencial) ante fallas de red, 5xx y 429, sin pasar de limit (monotonic)."""
+    for attempt in range(RETRIES + 1):
+        remaining = limit - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(url)
+        try:
+            resp = session.get(url, headers=headers, timeout=min(REQUEST_TIMEOUT, remaining), **extra)
+            if resp.status_code < 500 and resp.status_code != 429:
+                return resp
+            error = requests.HTTPError(f"{resp.status_code} en {url}", response=resp)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        pause = BACKOFF * 2 ** attempt
+        if attempt == RETRIES or time.monotonic() + pause >= limit:
+            raise error
+        time.sleep(pause)
+
+def _fetch_source(session, year, entry, source, limit):
+    """Devuelve (fuente, fechas, resp); fechas=None si el servidor respondió 304."""
+    name, url, parser, extra = source
+    resp = _get_with_retry(session, url.format(year=year), _conditional_headers(entry, name), limit, extra)
+    if resp.status_code == 304:
+        return name, None, resp
+    resp.raise_for_status()
+    dates = parser(resp.json(), year)
+    if not dates:
+        raise ValueError(f"{name}: sin feriados para {year}")
+    return name, dates, resp
+
+def refresh_years(store, years, deadline=HOLIDAYS_DEADLINE, sources=None, session=None, limit=None):
+    """
+    Descarga (o revalida) los años en paralelo. Por cada año se consultan todas las fuentes
+    a la vez y gana la primera respuesta válida; la etapa completa no dura más de deadline
+    segundos, o hasta limit (time.monotonic()) si se entrega, para compartir un mismo plazo
+    entre varias llamadas. Devuelve el conjunto de años que quedaron actualizados en el almacén.
+    Las descargas van en hilos daemon: una que siga colgada al vencer el plazo se abandona y
+    no retiene el cierre del programa (sólo este hilo escribe en el almacén).
+    """
+    years = list(years)
+    sources = sources or SOURCES
+    session = session or shared_session()
+    if limit is None:
+        limit = time.monotonic() + deadline
+    updated = set()
+    if not years:
+        return updated
+    tasks, results = queue.Queue(), queue.Queue()
+    for y in years:
+        entry = store.get(y)
+        for src in sources:
+            tasks.put((y, entry, src))
+    outstanding = tasks.qsize()
+
+    def worker():
+        while True:
+            try:
+                y, entry, src = tasks.get_nowait()
+            except queue.Empty:
+                return
+            # las fuentes que perdieron la carrera (o llegan tarde) ya no importan
+            if y in updated or time.monotonic() >= limit:
+                results.put((y, None))
+                continue
+            try:
+                results.put((y, _fetch_source(session, y, entry, src, limit)))
+            except Exception as e:
+                results.put((y, e))
+
+    for _ in range(min(POOL_SIZE, outstanding)):
+        threading.Thread(target=worker, name="feriados", daemon=True).start()
+    while outstanding and len(updated) < len(years):
+        remaining = limit - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            y, outcome = results.get(timeout=remaining)
+        except queue.Empty:
+            break
+        outstanding -= 1
+        if y in updated or outcome is None or isinstance(outcome, Exception):
+            continue
+        name, dates, resp = outcome
+        if dates is None:
+            store.touch(y)
+        else:
+            store.put(y, dates, name, etag=resp.headers.get("ETag"),
+                      last_modified=resp.headers.get("Last-Modified"))
+        updated.add(y)
+    return updated
+
+def _refresh_in_background(store, years, sources=None):
+    t = threading.Thread(target=refresh_years, args=(store, years), kwargs={"sources": sources},
+                         name="feriados-refresh", daemon=True)
+    t.start()
+    return t
+
+# ---------------- API ----------------
+_default_store = None
+
+def default_store():
+    global _default_store
+    if _default_store is None:
+        _default_store = HolidayStore()
+    return _default_store
+
+def _entry(store, year, mode):
+    # en "online" un año calculado por reglas cuenta como ausente
+    entry = store.get(year)
+    if entry is not None and mode == "online" and entry.get("source") == "rules":
+        return None
+    return entry
+
+def fetch_holidays_chile(years=None, store=None, background=True, deadline=HOLIDAYS_DEADLINE,
+                         sources=None, mode=None):
+    """
+    DataFrame con columna 'fecha' (datetime.date) para los años pedidos.
+    Años en caché: respuesta inmediata (revalidación en segundo plano si están vencidos).
+    Años ausentes: descarga en línea, acotada a deadline segundos.
+    mode (por defecto HOLIDAYS_MODE):
+     - "auto": caché/red y, para los años sin datos, las reglas legales (reglas_feriados),
+       que quedan en el caché hasta que venzan.
+     - "online": sólo caché/red; un año sin datos queda sin feriados (comportamiento anterior)
+       y los años guardados por reglas se ignoran.
+     - "rules": sólo reglas, sin tocar la red ni el caché.
+    """
+    if years is None:
+        years = [datetime.date.today().year]
+    mode = mode or HOLIDAYS_MODE
+    if mode == "rules":
+        return pd.DataFrame({"fecha": holiday_dates(years)})
+    if mode not in ("auto", "online"):
+        raise ValueError(f"Modo de feriados desconocido: {mode}")
+    store = store or default_store()
+    # un solo plazo para todo lo que bloquea esta llamada (años ausentes y revalidación en primer plano)
+    limit = time.monotonic() + deadline
+    missing, stale = [], []
+    for y in years:
+        entry = _entry(store, y, mode)
+        if entry is None:
+            missing.append(y)
+        elif not store.is_fresh(entry):
+            stale.append(y)
+    if missing:
+        refresh_years(store, missing, sources=sources, limit=limit)
+    if stale:
+        if background:
+            _refresh_in_background(store, stale, sources=sources)
+        else:
+            refresh_years(store, stale, sources=sources, limit=limit)
+    all_dates = []
+    for y in years:
+        dates = store.dates(y) if _entry(store, y, mode) is not None else []
+        if not dates and mode == "auto":
+            dates = holiday_dates([y])
+            store.put(y, dates, "rules")
+        all_dates.extend(dates)
+    return pd.DataFrame({"fecha": all_dates})
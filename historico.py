@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Historial columnar (Parquet) de las planillas extraídas.
+Cada corrida deja sus registros en formato largo (name, year, month, project, hours,
+source, file_hash) en historico_planillas/year=AAAA/month=M/planillas.parquet, de modo
+que una consulta de varios años no necesita volver a abrir ningún .xlsx.
+
+La unidad de actualización es el archivo de origen: upsert() reemplaza todas las filas de
+un source (también si su planilla cambió de mes) y no reescribe nada si el contenido del
+archivo no cambió, así que repetir una corrida es idempotente. En los meses que cubre la
+corrida, ésta manda: los sources archivados de esos meses que ya no vienen en la corrida
+(copias eliminadas por duplicado, archivos borrados o que dejaron de ser válidos) se
+quitan. Los meses que la corrida no toca conservan su historial aunque los archivos ya no
+estén. _fuentes.parquet guarda por source su tamaño, mtime, hash y partición.
+
+Requiere pyarrow (o fastparquet) para pandas.read_parquet / DataFrame.to_parquet.
+"""
+import os
+from pathlib import Path
+import pandas as pd
+from agregacion import HoursBuilder, consolidate
+from cache_planillas import file_hash
+
+ARCHIVE_DIR = "historico_planillas"
+PART_FILE = "planillas.parquet"
+INDEX_FILE = "_fuentes.parquet"
+COLUMNS = ["name", "year", "month", "project", "hours", "source", "file_hash"]
+INDEX_COLUMNS = ["source", "size", "mtime_ns", "file_hash", "year", "month"]
+
+def _period(value):
+    """'AAAA-MM' o (año, mes) -> (año, mes); None queda abierto."""
+    if value is None or isinstance(value, tuple):
+        return value
+    year, month = str(value).split("-")
+    return int(year), int(month)
+
+def _write(df, path):
+    # se escribe a un temporal y se reemplaza: una corrida interrumpida no deja la partición a medias
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+class HistoryArchive:
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = Path(root)
+
+    def _part(self, year, month):
+        return self.root / f"year={year}" / f"month={month}" / PART_FILE
+
+    def _read(self, path, columns):
+        if path.exists():
+            return pd.read_parquet(path)
+        return pd.DataFrame(columns=columns)
+
+    def partitions(self):
+        """[(año, mes), ...] de las particiones existentes, ordenadas."""
+        found = []
+        if not self.root.exists():
+            return found
+        for year_dir in os.scandir(self.root):
+            if not (year_dir.is_dir() and year_dir.name.startswith("year=")):
+                continue
+            for month_dir in os.scandir(year_dir.path):
+                if month_dir.is_dir() and month_dir.name.startswith("month="):
+                    if os.path.exists(os.path.join(month_dir.path, PART_FILE)):
+                        found.append((int(year_dir.name[5:]), int(month_dir.name[6:])))
+        return sorted(found)
+
+    # ---------------- escritura ----------------
+    def upsert(self, builder, paths):
+        """
+        Archiva las filas del HoursBuilder (una por archivo de paths, en el mismo orden) y
+        quita de los meses de la corrida los sources que ya no vienen en paths.
+        Devuelve (archivos escritos, archivos sin cambios, archivos quitados).
+        """
+        index = self._read(self.root / INDEX_FILE, INDEX_COLUMNS)
+        known = {row.source: row for row in index.itertuples(index=False)}
+        rows, cols, vals = builder.cells()
+        cells_of = {}
+        for r, c, v in zip(rows.tolist(), cols.tolist(), vals.tolist()):
+            cells_of.setdefault(r, []).append((builder.project_names[c], v))
+
+        new_rows, new_index, touched = [], {}, {}
+        unchanged = written = 0
+        current = set()
+        periods = set(zip((int(y) for y in builder.years), (int(m) for m in builder.months)))
+        for i, p in enumerate(paths):
+            source = str(Path(p).resolve())
+            current.add(source)
+            try:
+                st = os.stat(source)
+            except OSError:
+                continue
+            year, month = int(builder.years[i]), int(builder.months[i])
+            old = known.get(source)
+            same_place = old is not None and (old.year, old.month) == (year, month)
+            if same_place and (old.size, old.mtime_ns) == (st.st_size, st.st_mtime_ns):
+                unchanged += 1
+                continue
+            digest = file_hash(source)
+            new_index[source] = (source, st.st_size, st.st_mtime_ns, digest, year, month)
+            if same_place and old.file_hash == digest:
+                # sólo se tocó el archivo (copiado, re-guardado sin cambios)
+                unchanged += 1
+                continue
+            name = builder.names[i]
+            name = None if name is None else str(name)
+            # una planilla sin proyectos deja una fila vacía para conservar su fila en Alfa
+            for project, hours in cells_of.get(i, [(None, 0.0)]):
+                new_rows.append((name, year, month, None if project is None else str(project),
+                                 hours, source, digest))
+            written += 1
+            touched.setdefault((year, month), set()).add(source)
+            if old is not None and not same_place:
+                touched.setdefault((int(old.year), int(old.month)), set()).add(source)
+
+        stale = {source for source, row in known.items()
+                 if source not in current and (int(row.year), int(row.month)) in periods}
+        for source in stale:
+            row = known[source]
+            touched.setdefault((int(row.year), int(row.month)), set()).add(source)
+
+        new = pd.DataFrame(new_rows, columns=COLUMNS)
+        for (year, month), sources in touched.items():
+            part = self._part(year, month)
+            current = self._read(part, COLUMNS)
+            current = current[~current["source"].isin(sources)]
+            incoming = new[(new["year"] == year) & (new["month"] == month)]
+            merged = pd.concat([current, incoming], ignore_index=True) if len(current) else incoming
+            if len(merged):
+                _write(merged.astype({"year": "int64", "month": "int64", "hours": "float64"}), part)
+            elif part.exists():
+                part.unlink()
+        if new_index or stale:
+            index = index[~index["source"].isin(stale | new_index.keys())]
+            added = pd.DataFrame(list(new_index.values()), columns=INDEX_COLUMNS)
+            if not len(added):
+                merged = index
+            else:
+                merged = pd.concat([index, added], ignore_index=True) if len(index) else added
+            _write(merged, self.root / INDEX_FILE)
+        return written, unchanged, len(stale)
+
+    # ---------------- lectura ----------------
+    def load(self, start=None, end=None):
+        """Registros en formato largo de los meses entre start y end ('AAAA-MM', inclusive)."""
+        start, end = _period(start), _period(end)
+        parts = [self._part(y, m) for y, m in self.partitions()
+                 if (start is None or (y, m) >= start) and (end is None or (y, m) <= end)]
+        if not parts:
+            return pd.DataFrame(columns=COLUMNS)
+        return pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+
+    def rebuild(self, start=None, end=None):
+        """
+        (Alfa, Omega) del período sin abrir ninguna planilla: una fila de Alfa por archivo de
+        origen, ordenadas por año, mes y ruta; Omega sumado por Name, Year como en analyze().
+        """
+        records = self.load(start, end).sort_values(["year", "month", "source"], kind="stable")
+        builder = HoursBuilder()
+        for (year, month, _), rows in records.groupby(["year", "month", "source"], sort=False):
+            builder.add(rows["name"].iloc[0], int(month), int(year), rows["project"].tolist(), rows["hours"].tolist())
+        Alfa = builder.frame()
+        _, Omega, _ = consolidate(Alfa)
+        return Alfa, Omega
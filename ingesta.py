@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Ingesta de planillas en paralelo.
+Reparte la extracción + validación de cada archivo en un pool de procesos
+(openpyxl es CPU-bound y de un solo núcleo) y devuelve los resultados en el
+mismo orden de entrada.
+"""
+import os
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+# ---------------- dimensionamiento del pool ----------------
+# Bajo este volumen por proceso el costo de levantar el pool supera lo que se gana
+BYTES_PER_WORKER = 2 * 1024 * 1024
+MIN_FILES_PER_WORKER = 4
+# Rutas que iter_ingest mira por adelantado para decidir (y levantar) el pool
+STREAM_BLOCK = 256
+
+def auto_workers(paths):
+    """Número de procesos según núcleos disponibles, cantidad de archivos y tamaño total."""
+    cpus = os.cpu_count() or 1
+    total_bytes = 0
+    for p in paths:
+        try:
+            total_bytes += os.path.getsize(p)
+        except OSError:
+            continue
+    by_size = total_bytes // BYTES_PER_WORKER + 1
+    by_count = len(paths) // MIN_FILES_PER_WORKER + 1
+    return max(1, min(cpus, by_size, by_count))
+
+# ---------------- ingesta ----------------
+def _inspect_now(p, inspect_fn, on_error, cache):
+    try:
+        rec, errors = inspect_fn(p)
+    except Exception as e:
+        return on_error(p, e)
+    if cache is not None:
+        cache.put(p, rec, errors)
+    return rec, errors
+
+def _collect(p, hit, fut, on_error, cache):
+    if hit is not None:
+        return p, *hit
+    try:
+        rec, errors = fut.result()
+    except Exception as e:
+        return p, *on_error(p, e)
+    if cache is not None:
+        cache.put(p, rec, errors)
+    return p, rec, errors
+
+def _no_hit(p):
+    return None
+
+def iter_ingest(paths, inspect_fn, on_error, workers=None, cache=None, max_in_flight=None):
+    """
+    Versión en streaming de ingest(): consume paths (puede ser un generador) y va
+    entregando (path, rec, errors) en el mismo orden. Con pool, a lo más max_in_flight
+    archivos (por defecto 4 por proceso) están encolados o en proceso a la vez.
+    workers=None: el pool se dimensiona con auto_workers() sobre los archivos sin caché de
+    cada bloque de STREAM_BLOCK rutas y se levanta recién cuando hace falta.
+    """
+    lookup = cache.get if cache is not None else _no_hit
+    return _iter_ingest(paths, inspect_fn, on_error, workers, cache, lookup, max_in_flight)
+
+def _blocks(paths, size):
+    it = iter(paths)
+    while True:
+        block = list(islice(it, size))
+        if not block:
+            return
+        yield block
+
+def _iter_ingest(paths, inspect_fn, on_error, workers, cache, lookup, max_in_flight):
+    # lookup(p) -> (rec, errors) ya guardado o None; cache sólo recibe los archivos abiertos
+    pool = None
+    limit = 1
+    window = deque()
+    try:
+        for block in _blocks(paths, STREAM_BLOCK):
+            looked = [(p, lookup(p)) for p in block]
+            misses = [p for p, hit in looked if hit is None]
+            if pool is None and misses and workers != 1:
+                n = auto_workers(misses) if workers is None else workers
+                if n > 1:
+                    pool = ProcessPoolExecutor(max_workers=n)
+                    limit = max_in_flight or n * 4
+            for p, hit in looked:
+                if hit is None and pool is None:
+                    # en serie: se resuelve ya y queda en la ventana sólo para mantener el orden
+                    hit = _inspect_now(p, inspect_fn, on_error, cache)
+                fut = pool.submit(inspect_fn, p) if hit is None else None
+                window.append((p, hit, fut))
+                while len(window) >= limit:
+                    yield _collect(*window.popleft(), on_error, cache)
+        while window:
+            yield _collect(*window.popleft(), on_error, cache)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+def ingest(paths, inspect_fn, on_error, workers=None, cache=None):
+    """
+    Aplica inspect_fn(path) -> (rec, errors) a cada archivo.
+    - workers=None: se calcula con auto_workers(); workers=1 procesa en serie sin pool.
+    - on_error(path, exc) construye el mismo (None, errors) que inspect_fn para fallas
+      que escapan a la función (p.ej. el proceso hijo murió).
+    - cache: PlanillaCache opcional; los archivos sin cambios no se vuelven a abrir.
+    Devuelve lista de (path, rec, errors) en el orden de paths.
+    """
+    paths = list(paths)
+    done = {}
+    if cache is not None:
+        for i, p in enumerate(paths):
+            hit = cache.get(p)
+            if hit is not None:
+                done[i] = hit
+    # el pool se dimensiona sólo con los archivos que hay que abrir: una corrida casi toda
+    # en caché no levanta procesos
+    pending = [i for i in range(len(paths)) if i not in done]
+    if workers is None:
+        workers = auto_workers([paths[i] for i in pending])
+    if len(pending) <= 1:
+        workers = 1
+    fresh = _iter_ingest([paths[i] for i in pending], inspect_fn, on_error, workers, cache, _no_hit, None)
+    for i, (_, rec, errors) in zip(pending, fresh):
+        done[i] = (rec, errors)
+    return [(p, *done[i]) for i, p in enumerate(paths)]
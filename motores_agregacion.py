@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Motores para la agregación Alfa -> Total_HH ("Horas Realizadas") -> Omega -> Suma.
+ - "pandas" (por defecto): HoursBuilder.frame() + agregacion.consolidate(), el camino de siempre.
+ - "polars" / "duckdb": las sumas por grupo se hacen sobre las celdas (fila, proyecto, horas)
+   del HoursBuilder en el motor columnar, que usa todos los núcleos. Las claves se codifican
+   con agregacion.group_index (mismo orden de filas y columnas que pandas) y las matrices
+   sólo se densifican al final para armar los DataFrame de salida.
+Polars y DuckDB son dependencias opcionales: se importan recién al elegir el motor.
+"""
+import os
+import sys
+import numpy as np
+import pandas as pd
+from agregacion import consolidate, group_index
+
+# "pandas" | "polars" | "duckdb"
+AGGREGATION_ENGINE = "pandas"
+# Hilos del motor columnar (None = los que decida el motor, normalmente uno por núcleo)
+ENGINE_THREADS = None
+
+# ---------------- motores columnares ----------------
+def _sum_cells_polars(group, col, val):
+    if ENGINE_THREADS and "polars" not in sys.modules:
+        # Polars fija su pool de hilos al importarse
+        os.environ.setdefault("POLARS_MAX_THREADS", str(ENGINE_THREADS))
+    import polars as pl
+    cells = pl.DataFrame({"g": group, "c": col, "v": val})
+    out = cells.group_by(["g", "c"]).agg(pl.col("v").sum())
+    return out["g"].to_numpy(), out["c"].to_numpy(), out["v"].to_numpy()
+
+def _sum_cells_duckdb(group, col, val):
+    import duckdb
+    con = duckdb.connect()
+    try:
+        if ENGINE_THREADS:
+            con.execute(f"SET threads = {int(ENGINE_THREADS)}")
+        con.register("cells", pd.DataFrame({"g": group, "c": col, "v": val}))
+        out = con.execute("SELECT g, c, SUM(v) AS v FROM cells GROUP BY g, c").fetchnumpy()
+    finally:
+        con.close()
+    return out["g"], out["c"], out["v"]
+
+_CELL_ENGINES = {"polars": _sum_cells_polars, "duckdb": _sum_cells_duckdb}
+
+def _dense(sum_cells, group, col, val, shape):
+    """Suma las celdas repetidas (grupo, proyecto) en el motor y las vuelca a una matriz densa."""
+    dense = np.zeros(shape, dtype=np.float64)
+    if len(val):
+        g, c, v = sum_cells(group, col, val)
+        dense[np.asarray(g, dtype=np.int64), np.asarray(c, dtype=np.int64)] = v
+    return dense
+
+# ---------------- API ----------------
+def aggregate(builder, engine=None, by=("Name", "Year")):
+    """
+    Devuelve (Alfa, realizadas, Omega, Suma) a partir de un HoursBuilder, igual que
+    Alfa = builder.frame() seguido de consolidate(Alfa, by): una fila de Alfa por planilla,
+    Omega sumado por by y Suma por proyecto. engine por defecto: AGGREGATION_ENGINE.
+    """
+    engine = engine or AGGREGATION_ENGINE
+    if engine == "pandas":
+        Alfa = builder.frame()
+        return (Alfa, *consolidate(Alfa, by=by))
+    sum_cells = _CELL_ENGINES.get(engine)
+    if sum_cells is None:
+        raise ValueError(f"Motor de agregación desconocido: {engine}")
+
+    keys = pd.DataFrame({"Name": builder.names, "Month": builder.months, "Year": builder.years})
+    n_rows, n_projects = len(keys), len(builder.project_names)
+    rows, cols, vals = builder.cells()
+    rows, cols = rows.astype(np.int64), cols.astype(np.int64)
+
+    alfa = _dense(sum_cells, rows, cols, vals, (n_rows, n_projects))
+    inverse, group_keys = group_index(keys, list(by))
+    omega = _dense(sum_cells, inverse[rows], cols, vals, (len(group_keys), n_projects))
+
+    projects = pd.Index(builder.project_names)
+    Alfa = pd.concat([keys, pd.DataFrame(alfa, columns=projects)], axis=1)
+    Omega = pd.concat([group_keys, pd.DataFrame(omega, columns=projects)], axis=1)
+    Suma = pd.DataFrame({"Total": omega.sum(axis=0)}, index=projects)
+    return Alfa, alfa.sum(axis=1), Omega, Suma
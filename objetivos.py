@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Horas objetivo por mes (columna "Horas objetivo*" de Total_HH).
+El calendario laboral (lunes a viernes menos feriados) se arma una sola vez como
+np.busdaycalendar. Días hábiles y horas objetivo se compilan una vez a un arreglo por mes
+(un busday_count vectorizado por tramo de la jornada semanal vigente, WEEKLY_HOURS_POLICY)
+y cada fila (Year, Month) se resuelve con un gather sobre ese arreglo.
+
+Opcionalmente, calendario_personal.xlsx ajusta el objetivo por persona (jornada parcial,
+ingresos/salidas a mitad de mes, licencias y vacaciones); ver EmployeeCalendar.
+"""
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+WEEKMASK = "1111100"
+DAYS_PER_WEEK = 5
+
+# Jornada semanal (horas) vigente desde cada fecha. Ley 21.561 ("40 horas"): 45 -> 44 -> 42 -> 40.
+# Para un objetivo fijo basta una sola fila, p.ej. (("1900-01-01", 40),) = 8 h diarias.
+WEEKLY_HOURS_POLICY = (
+    ("1900-01-01", 45),
+    ("2024-04-26", 44),
+    ("2026-04-26", 42),
+    ("2028-04-26", 40),
+)
+
+EMPLOYEE_CALENDAR_FILE = "calendario_personal.xlsx"
+CONTRACTS_SHEET = "Contratos"      # Name | Horas diarias | Inicio | Término
+LEAVES_SHEET = "Ausencias"         # Name | Desde | Hasta
+# Límites para contratos sin fecha de inicio o de término
+_FIRST_DAY = np.datetime64("1900-01-01", "D")
+_LAST_DAY = np.datetime64("2200-01-01", "D")
+
+def _month_index(years, months):
+    """Meses desde 1970-01 (la unidad de datetime64[M])."""
+    years = np.asarray(years, dtype=np.int64)
+    months = np.asarray(months, dtype=np.int64)
+    return (years - 1970) * 12 + months - 1
+
+def _month_bounds(month_idx):
+    starts = month_idx.astype("datetime64[M]")
+    return starts.astype("datetime64[D]"), (starts + 1).astype("datetime64[D]")
+
+def _name_key(names):
+    # los nombres se escriben a mano en ambos lados: se comparan sin espacios extremos ni mayúsculas
+    return pd.Series(list(names), dtype=object).astype(str).str.strip().str.casefold().to_numpy()
+
+def _dates(df, column, default):
+    if df is None or column not in df:
+        return np.full(0 if df is None else len(df), default, dtype="datetime64[D]")
+    # celdas de fecha de Excel o texto ISO; el texto restante se interpreta como dd/mm/aaaa
+    raw = df[column]
+    parsed = pd.to_datetime(raw, errors="coerce", format="ISO8601")
+    retry = parsed.isna() & raw.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(raw[retry].astype(str), errors="coerce", dayfirst=True)
+    values = parsed.to_numpy().astype("datetime64[D]")
+    return np.where(np.isnat(values), default, values)
+
+# ---------------- calendario por persona ----------------
+class EmployeeCalendar:
+    """
+    Jornada y vigencia de contrato por persona, más ausencias (licencias, vacaciones, permisos).
+    Una persona puede tener varios contratos (p.ej. cambio de jornada); Horas diarias vacío
+    usa la jornada general. Las personas que no aparecen usan el objetivo general.
+
+    Todo se reduce a una tabla de segmentos (persona, desde, hasta, horas/día, signo):
+    cada contrato suma sus días hábiles y cada ausencia dentro de un contrato los resta.
+    """
+    def __init__(self, contracts, leaves=None):
+        contracts = pd.DataFrame({
+            "key": _name_key(contracts["Name"]),
+            "start": _dates(contracts, "Inicio", _FIRST_DAY),
+            "end": _dates(contracts, "Término", _LAST_DAY - 1) + 1,      # exclusivo
+            "hpd": pd.to_numeric(contracts.get("Horas diarias"), errors="coerce")
+                   if "Horas diarias" in contracts else np.nan,
+        })
+        self.names = np.unique(contracts["key"].to_numpy())
+        segments = [contracts.assign(sign=1.0)]
+        if leaves is not None and len(leaves):
+            leaves = self._merge_overlaps(pd.DataFrame({
+                "key": _name_key(leaves["Name"]),
+                "l_start": _dates(leaves, "Desde", _FIRST_DAY),
+                "l_end": _dates(leaves, "Hasta", _LAST_DAY - 1) + 1,
+            }))
+            cut = contracts.merge(leaves, on="key")
+            cut["start"] = np.maximum(cut["start"].to_numpy(), cut["l_start"].to_numpy())
+            cut["end"] = np.minimum(cut["end"].to_numpy(), cut["l_end"].to_numpy())
+            cut = cut[cut["end"] > cut["start"]]
+            segments.append(cut[["key", "start", "end", "hpd"]].assign(sign=-1.0))
+        self.segments = pd.concat(segments, ignore_index=True)
+
+    @staticmethod
+    def _merge_overlaps(leaves):
+        """Une ausencias superpuestas o contiguas de una misma persona para no descontar dos veces."""
+        leaves = leaves.sort_values(["key", "l_start"], kind="stable").reset_index(drop=True)
+        prev_end = leaves.groupby("key")["l_end"].cummax().groupby(leaves["key"]).shift()
+        block = (prev_end.isna() | (leaves["l_start"] > prev_end)).cumsum()
+        return leaves.groupby(block).agg(key=("key", "first"), l_start=("l_start", "min"),
+                                         l_end=("l_end", "max")).reset_index(drop=True)
+
+    @classmethod
+    def load(cls, path=EMPLOYEE_CALENDAR_FILE):
+        """Lee las hojas Contratos/Ausencias; None si el archivo no existe (es opcional)."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        sheets = pd.read_excel(path, sheet_name=None)
+        if CONTRACTS_SHEET not in sheets:
+            raise ValueError(f"{path.name}: falta la hoja '{CONTRACTS_SHEET}'")
+        return cls(sheets[CONTRACTS_SHEET], sheets.get(LEAVES_SHEET))
+
+    def __len__(self):
+        return len(self.names)
+
+    def target_hours(self, names, month_idx, default_hpd, busdaycal):
+        """
+        Devuelve (horas, cubierto): horas objetivo de cada fila según sus contratos/ausencias
+        y una máscara de las filas cuya persona figura en el calendario.
+        """
+        keys = _name_key(names)
+        n = len(keys)
+        rows = pd.DataFrame({"row": np.arange(n), "key": keys})
+        joined = rows.merge(self.segments, on="key")
+        r = joined["row"].to_numpy()
+        month_start, month_end = _month_bounds(month_idx[r])
+        lo = np.maximum(month_start, joined["start"].to_numpy().astype("datetime64[D]"))
+        hi = np.minimum(month_end, joined["end"].to_numpy().astype("datetime64[D]"))
+        days = np.busday_count(lo, np.maximum(lo, hi), busdaycal=busdaycal)
+        hpd = joined["hpd"].to_numpy(dtype=np.float64)
+        hpd = np.where(np.isnan(hpd), default_hpd[r], hpd)
+        hours = np.bincount(r, weights=days * hpd * joined["sign"].to_numpy(), minlength=n)
+        return hours, np.isin(keys, self.names)
+
+# ---------------- jornada por período ----------------
+class HoursPolicy:
+    """Tabla de jornada semanal por fecha de vigencia; se compila a horas objetivo por mes."""
+    def __init__(self, table=WEEKLY_HOURS_POLICY, days_per_week=DAYS_PER_WEEK):
+        table = sorted((np.datetime64(day, "D"), float(hours)) for day, hours in table)
+        self.starts = np.array([day for day, _ in table], dtype="datetime64[D]")
+        self.ends = np.append(self.starts[1:], _LAST_DAY)
+        self.daily = np.array([hours for _, hours in table]) / days_per_week
+
+    def compile(self, month_idx, busdaycal):
+        """
+        Para cada mes: (días hábiles, horas objetivo). Un mes con cambio de jornada a mitad
+        de mes suma cada tramo con su propia jornada.
+        """
+        month_start, month_end = _month_bounds(np.asarray(month_idx))
+        lo = np.maximum(month_start[:, None], self.starts[None, :])
+        hi = np.minimum(month_end[:, None], self.ends[None, :])
+        days = np.busday_count(lo, np.maximum(lo, hi), busdaycal=busdaycal)
+        return days.sum(axis=1), days @ self.daily
+
+# ---------------- calendario general ----------------
+class WorkCalendar:
+    def __init__(self, holidays_df=None, policy=None, employees=None):
+        """
+        holidays_df: DataFrame con columna 'fecha' (salida de fetch_holidays_chile).
+        policy: HoursPolicy (por defecto WEEKLY_HOURS_POLICY).
+        employees: EmployeeCalendar opcional con los ajustes por persona.
+        """
+        if holidays_df is None or holidays_df.empty:
+            dates = np.array([], dtype="datetime64[D]")
+        else:
+            dates = np.unique(np.array(list(holidays_df["fecha"]), dtype="datetime64[D]"))
+        self.holidays = dates
+        self.busdaycal = np.busdaycalendar(weekmask=WEEKMASK, holidays=dates)
+        self.policy = policy or HoursPolicy()
+        self.employees = employees
+        # tabla compilada: meses consecutivos desde _first_month
+        self._first_month = 0
+        self._workdays = np.zeros(0, dtype=np.int64)
+        self._targets = np.zeros(0, dtype=np.float64)
+
+    def _lookup(self, month_idx):
+        """Índices en la tabla por mes; la (re)compila una vez si faltan meses."""
+        lo, hi = int(month_idx.min()), int(month_idx.max())
+        first, last = self._first_month, self._first_month + len(self._targets) - 1
+        if len(self._targets) == 0 or lo < first or hi > last:
+            if len(self._targets):
+                lo, hi = min(lo, first), max(hi, last)
+            months = np.arange(lo, hi + 1)
+            self._workdays, self._targets = self.policy.compile(months, self.busdaycal)
+            self._first_month = lo
+        return month_idx - self._first_month
+
+    def month_table(self, years, months):
+        """Tabla Year, Month, Workdays, Horas objetivo* con un renglón por mes distinto."""
+        uniq = np.unique(_month_index(years, months))
+        pos = self._lookup(uniq) if len(uniq) else uniq
+        return pd.DataFrame({
+            "Year": uniq // 12 + 1970,
+            "Month": uniq % 12 + 1,
+            "Workdays": self._workdays[pos],
+            "Horas objetivo*": self._targets[pos],
+        })
+
+    def target_hours(self, years, months, names=None):
+        """
+        Horas objetivo de cada fila (Year, Month). Con names y un calendario por persona,
+        las filas de personas con contrato registrado usan su propio objetivo.
+        """
+        month_idx = _month_index(years, months)
+        if len(month_idx) == 0:
+            return np.zeros(0, dtype=np.float64)
+        pos = self._lookup(month_idx)
+        target = self._targets[pos]
+        if self.employees is None or names is None:
+            return target
+        # jornada general promedio del mes para los contratos sin Horas diarias propias
+        workdays = self._workdays[pos]
+        default_hpd = np.divide(target, workdays, out=np.zeros_like(target), where=workdays > 0)
+        own, covered = self.employees.target_hours(names, month_idx, default_hpd, self.busdaycal)
+        return np.where(covered, own, target)
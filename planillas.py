@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+"""
+Lectura acotada de planillas HH.
+Abre el libro en modo solo-lectura (streaming) y extrae únicamente las celdas
+que usa el análisis, sin cargar la hoja completa con pd.read_excel.
+
+Motores de lectura:
+ - "xml": abre el .xlsx como zip y recorre sheet1.xml con iterparse hasta la fila de totales.
+ - "openpyxl": load_workbook(read_only=True).
+ - "auto" (por defecto): "xml" y, si la estructura no es la esperada, "openpyxl".
+"""
+import math
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from array import array
+from pathlib import Path
+import openpyxl
+from openpyxl.styles.numbers import builtin_format_code, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import from_excel, CALENDAR_MAC_1904, WINDOWS_EPOCH
+
+# ---------------- layout de la plantilla ----------------
+# Coordenadas Excel (base 1). pd.read_excel(header=0) usa la fila 1 como encabezado,
+# por lo que df.iloc[r, c] del código anterior equivale a la fila Excel r+2, columna c+1.
+NAME_CELL = (1, 5)             # df.columns[4]
+MONTH_CELL = (3, 4)            # df.iloc[1,3]
+YEAR_CELL = (3, 12)            # df.iloc[1,11]
+GUIDE_CELL = (3, 16)           # df.iloc[1,15]
+PROJECTS_ROW = 5               # df.iloc[3,15:34]
+TOTALS_ROW = 39                # df.iloc[37,15:34]
+FIRST_PROJECT_COL = 16         # P
+LAST_PROJECT_COL = 34          # AH
+LAST_ROW = TOTALS_ROW
+
+GUIDE_TEXT = "D E S G L O S E    P O R    P R O Y E C T O"
+
+DEFAULT_ENGINE = "auto"
+NAN = float("nan")
+
+# ---------------- registro compacto ----------------
+class ProjectCatalog:
+    """Interna nombres de proyecto a ids enteros (propios de cada proceso)."""
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def intern(self, name):
+        if name is None or (isinstance(name, float) and math.isnan(name)):
+            return -1
+        pid = self.ids.get(name)
+        if pid is None:
+            pid = len(self.names)
+            self.ids[name] = pid
+            self.names.append(name)
+        return pid
+
+    def name(self, pid):
+        return None if pid < 0 else self.names[pid]
+
+PROJECTS = ProjectCatalog()
+
+class PlanillaRecord:
+    """
+    Una planilla extraída. Los proyectos se guardan como ids de PROJECTS y las horas en un
+    array('d') (NaN = celda vacía); los totales no numéricos se conservan aparte en extras
+    para que la validación pueda reportarlos. month/year quedan en None hasta que la etapa
+    de validación los convierte a enteros.
+    Al serializar (pool de procesos, caché) viajan los nombres, no los ids.
+    """
+    __slots__ = ("path", "name", "month_raw", "year_raw", "guide",
+                 "month", "year", "project_ids", "hours", "extras")
+
+    def __init__(self, path, name, month_raw, year_raw, guide, projects, totals):
+        self.path = path
+        self.name = name
+        self.month_raw = month_raw
+        self.year_raw = year_raw
+        self.guide = guide
+        self.month = None
+        self.year = None
+        self.project_ids = array("i", (PROJECTS.intern(p) for p in projects))
+        self.hours = array("d")
+        self.extras = None
+        for idx, v in enumerate(totals):
+            if isinstance(v, (int, float)) and not isinstance(v, bool):
+                self.hours.append(v)
+            else:
+                self.hours.append(NAN)
+                if v is not None:
+                    self.extras = self.extras or {}
+                    self.extras[idx] = v
+
+    @property
+    def projects(self):
+        return [PROJECTS.name(pid) for pid in self.project_ids]
+
+    @property
+    def totals(self):
+        totals = self.hours.tolist()
+        if self.extras:
+            for idx, v in self.extras.items():
+                totals[idx] = v
+        return totals
+
+    def set_period(self, month, year):
+        self.month = month
+        self.year = year
+
+    def __getstate__(self):
+        return (self.path, self.name, self.month_raw, self.year_raw, self.guide,
+                self.month, self.year, self.projects, self.totals)
+
+    def __setstate__(self, state):
+        path, name, month_raw, year_raw, guide, month, year, projects, totals = state
+        self.__init__(path, name, month_raw, year_raw, guide, projects, totals)
+        self.month = month
+        self.year = year
+
+    def __repr__(self):
+        return f"PlanillaRecord({self.path.name!r}, name={self.name!r}, month={self.month_raw!r}, year={self.year_raw!r})"
+
+class LayoutError(Exception):
+    """El .xlsx no tiene la estructura que espera el lector XML."""
+
+def _cell(rows, row, col):
+    values = rows.get(row)
+    if values is None or col > len(values):
+        return None
+    return values[col - 1]
+
+def _wanted_rows():
+    return {NAME_CELL[0], MONTH_CELL[0], YEAR_CELL[0], GUIDE_CELL[0], PROJECTS_ROW, TOTALS_ROW}
+
+def _guide_mismatch(value):
+    return str(value) != GUIDE_TEXT
+
+# ---------------- motor openpyxl ----------------
+def _read_rows_openpyxl(path, wanted, fail_fast=False):
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        rows = {}
+        for r_idx, values in enumerate(ws.iter_rows(min_row=1, max_row=LAST_ROW, max_col=LAST_PROJECT_COL,
+                                                    values_only=True), start=1):
+            if r_idx in wanted:
+                rows[r_idx] = values
+            if fail_fast and r_idx == GUIDE_CELL[0] and _guide_mismatch(_cell(rows, *GUIDE_CELL)):
+                break
+    finally:
+        wb.close()
+    return rows
+
+# ---------------- motor XML ----------------
+_NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_CELL_REF = re.compile(r"^([A-Z]+)(\d+)$")
+
+def _col_index(letters):
+    idx = 0
+    for ch in letters:
+        idx = idx * 26 + (ord(ch) - 64)
+    return idx
+
+def _first_sheet_part(zf):
+    """Ruta dentro del zip de la primera hoja según workbook.xml (no siempre es sheet1.xml)."""
+    try:
+        wb = ET.fromstring(zf.read("xl/workbook.xml"))
+        rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    except KeyError as e:
+        raise LayoutError(f"falta {e}")
+    sheet = wb.find(f"{_NS_MAIN}sheets/{_NS_MAIN}sheet")
+    if sheet is None:
+        raise LayoutError("libro sin hojas")
+    rid = sheet.get(f"{_NS_REL}id")
+    for rel in rels.iter(f"{_NS_PKG_REL}Relationship"):
+        if rel.get("Id") == rid:
+            target = rel.get("Target")
+            if target.startswith("/"):
+                return target.lstrip("/")
+            return posixpath.normpath(posixpath.join("xl", target))
+    raise LayoutError("no se encontró la relación de la primera hoja")
+
+def _cast_number(text):
+    # mismo criterio que openpyxl: entero salvo que tenga decimales o exponente
+    if any(ch in text for ch in ".Ee"):
+        return float(text)
+    return int(text)
+
+def _shared_strings(zf, needed):
+    """Resuelve sólo los índices de sharedStrings.xml que se usan; corta al pasar el mayor."""
+    if not needed:
+        return {}
+    last = max(needed)
+    found = {}
+    idx = -1
+    try:
+        fh = zf.open("xl/sharedStrings.xml")
+    except KeyError:
+        raise LayoutError("falta xl/sharedStrings.xml")
+    with fh:
+        for event, elem in ET.iterparse(fh, events=("end",)):
+            if elem.tag != f"{_NS_MAIN}si":
+                continue
+            idx += 1
+            if idx in needed:
+                # texto plano (<t>) o enriquecido (<r><t>); se omite la fonética (<rPh>)
+                parts = []
+                for child in elem:
+                    if child.tag == f"{_NS_MAIN}t":
+                        parts.append(child.text or "")
+                    elif child.tag == f"{_NS_MAIN}r":
+                        t = child.find(f"{_NS_MAIN}t")
+                        parts.append(t.text or "" if t is not None else "")
+                found[idx] = "".join(parts)
+            elem.clear()
+            if idx >= last:
+                break
+    if len(found) != len(needed):
+        raise LayoutError("índice de sharedStrings fuera de rango")
+    return found
+
+def _date_styles(zf):
+    """
+    (estilos de fecha/hora, estilos de duración): índices de cellXfs cuyo formato numérico
+    (integrado o propio de numFmts) es de fecha, con el mismo criterio que openpyxl.
+    """
+    try:
+        root = ET.fromstring(zf.read("xl/styles.xml"))
+    except KeyError:
+        return set(), set()
+    custom = {int(f.get("numFmtId")): f.get("formatCode") for f in root.iter(f"{_NS_MAIN}numFmt")}
+    dates, durations = set(), set()
+    xfs = root.find(f"{_NS_MAIN}cellXfs")
+    for idx, xf in enumerate(xfs if xfs is not None else ()):
+        fmt_id = int(xf.get("numFmtId", 0))
+        fmt = custom.get(fmt_id) or builtin_format_code(fmt_id)
+        if fmt is None:
+            continue
+        if is_date_format(fmt):
+            dates.add(idx)
+        if is_timedelta_format(fmt):
+            durations.add(idx)
+    return dates, durations
+
+def _epoch(zf):
+    pr = ET.fromstring(zf.read("xl/workbook.xml")).find(f"{_NS_MAIN}workbookPr")
+    if pr is not None and pr.get("date1904", "").lower() in ("1", "true"):
+        return CALENDAR_MAC_1904
+    return WINDOWS_EPOCH
+
+def _as_date(value, epoch, duration):
+    # igual que openpyxl: serial -> datetime/time/timedelta; fuera de rango queda como error
+    try:
+        return from_excel(value, epoch, timedelta=duration)
+    except (OverflowError, ValueError):
+        return "#VALUE!"
+
+def _value(t, text, strings):
+    if t == "s":
+        return strings[int(text)]
+    if t == "b":
+        return text == "1"
+    if t == "n":
+        return _cast_number(text)
+    if t in ("str", "inlineStr", "e"):
+        return text
+    # fechas ISO ("d") u otros tipos: que decida openpyxl
+    raise LayoutError(f"tipo de celda no soportado: {t}")
+
+def _raw_guide(zf, raw):
+    cell = raw.get(GUIDE_CELL)
+    if cell is None:
+        return None
+    t, text, _ = cell
+    return _value(t, text, _shared_strings(zf, {int(text)}) if t == "s" else {})
+
+def _read_rows_xml(path, wanted, fail_fast=False):
+    """
+    fail_fast: al terminar la fila de la celda guía se compara su texto y, si no es el de la
+    plantilla, se deja de leer (no se recorren las filas de proyectos ni de totales).
+    """
+    with zipfile.ZipFile(path) as zf:
+        part = _first_sheet_part(zf)
+        raw = {}          # (fila, col) -> (tipo, texto, estilo)
+        shared = set()
+        styled = False    # algún número con estilo: puede tener formato de fecha/hora
+        try:
+            fh = zf.open(part)
+        except KeyError:
+            raise LayoutError(f"falta {part}")
+        with fh:
+            for event, elem in ET.iterparse(fh, events=("end",)):
+                if elem.tag != f"{_NS_MAIN}row":
+                    continue
+                r_attr = elem.get("r")
+                if r_attr is None:
+                    raise LayoutError("fila sin atributo r")
+                r_idx = int(r_attr)
+                if r_idx > LAST_ROW:
+                    break
+                if r_idx in wanted:
+                    for c in elem.iter(f"{_NS_MAIN}c"):
+                        m = _CELL_REF.match(c.get("r") or "")
+                        if m is None:
+                            raise LayoutError("celda sin referencia")
+                        col = _col_index(m.group(1))
+                        if col > LAST_PROJECT_COL:
+                            continue
+                        t = c.get("t", "n")
+                        if t == "inlineStr":
+                            text = "".join(x.text or "" for x in c.iter(f"{_NS_MAIN}t"))
+                        else:
+                            v = c.find(f"{_NS_MAIN}v")
+                            text = v.text if v is not None else None
+                        if text is None:
+                            continue
+                        style = int(c.get("s", 0))
+                        raw[(r_idx, col)] = (t, text, style)
+                        if t == "s":
+                            shared.add(int(text))
+                        elif t == "n" and style:
+                            styled = True
+                elem.clear()
+                if fail_fast and r_idx >= GUIDE_CELL[0]:
+                    fail_fast = False
+                    if _guide_mismatch(_raw_guide(zf, raw)):
+                        break
+        strings = _shared_strings(zf, shared)
+        dates, durations = _date_styles(zf) if styled else (set(), set())
+        epoch = _epoch(zf) if dates else WINDOWS_EPOCH
+
+    rows = {r: [None] * LAST_PROJECT_COL for r in wanted}
+    for (r_idx, col), (t, text, style) in raw.items():
+        value = _value(t, text, strings)
+        if t == "n" and style in dates:
+            value = _as_date(value, epoch, style in durations)
+        rows[r_idx][col - 1] = value
+    return {r: tuple(v) for r, v in rows.items()}
+
+# ---------------- extracción ----------------
+def extract_planilla(path, engine=None, fail_fast=False):
+    """
+    Lee sólo los rangos fijos de la plantilla (encabezado, fila de proyectos y fila de totales).
+    Lanza la excepción del lector si el archivo no se puede abrir.
+    fail_fast=True deja de leer si la celda guía no coincide: el registro queda sólo con el
+    encabezado (sin proyectos ni totales).
+    """
+    path = Path(path)
+    engine = engine or DEFAULT_ENGINE
+    wanted = _wanted_rows()
+    if engine == "openpyxl":
+        rows = _read_rows_openpyxl(path, wanted, fail_fast)
+    elif engine == "xml":
+        rows = _read_rows_xml(path, wanted, fail_fast)
+    elif engine == "auto":
+        try:
+            rows = _read_rows_xml(path, wanted, fail_fast)
+        except (LayoutError, ET.ParseError, zipfile.BadZipFile, ValueError):
+            rows = _read_rows_openpyxl(path, wanted, fail_fast)
+    else:
+        raise ValueError(f"Motor de lectura desconocido: {engine}")
+
+    cols = range(FIRST_PROJECT_COL, LAST_PROJECT_COL + 1)
+    projects = [_cell(rows, PROJECTS_ROW, c) for c in cols]
+    totals = [_cell(rows, TOTALS_ROW, c) for c in cols]
+    return PlanillaRecord(
+        path=path,
+        name=_cell(rows, *NAME_CELL),
+        month_raw=_cell(rows, *MONTH_CELL),
+        year_raw=_cell(rows, *YEAR_CELL),
+        guide=_cell(rows, *GUIDE_CELL),
+        projects=projects,
+        totals=totals,
+    )
+
+def sniff_planilla(path, engine=None):
+    """Extracción para la revisión rápida: corta en la celda guía si no es una planilla de la plantilla."""
+    return extract_planilla(path, engine=engine, fail_fast=True)
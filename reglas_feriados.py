@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Feriados nacionales de Chile calculados a partir de las reglas legales (sin red).
+Sirve para años que los APIs no publican (auditorías históricas, planificación del
+año siguiente) y como respaldo cuando no hay conexión. No incluye feriados regionales
+ni los decretados caso a caso (elecciones, censos, feriados puente por ley especial).
+"""
+import datetime
+import math
+from functools import lru_cache
+
+# Diferencia horaria de Chile continental en junio (horario de invierno, UTC-4)
+CHILE_WINTER_UTC_OFFSET = -4
+
+def easter_sunday(year):
+    """Domingo de Pascua (algoritmo gregoriano anónimo de Meeus/Jones/Butcher)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return datetime.date(year, month, day + 1)
+
+# Términos periódicos (A, B, C) de Meeus, "Astronomical Algorithms", tabla 27.C
+_SOLSTICE_TERMS = (
+    (485, 324.96, 1934.136), (203, 337.23, 32964.467), (199, 342.08, 20.186),
+    (182, 27.85, 445267.112), (156, 73.14, 45036.886), (136, 171.52, 22518.443),
+    (77, 222.54, 65928.934), (74, 296.72, 3034.906), (70, 243.58, 9037.513),
+    (58, 119.81, 33718.147), (52, 297.17, 150.678), (50, 21.02, 2281.226),
+    (45, 247.54, 29929.562), (44, 325.15, 31555.956), (29, 60.93, 4443.417),
+    (18, 155.12, 67555.328), (17, 288.79, 4562.452), (16, 198.04, 62894.029),
+    (14, 199.76, 31436.921), (12, 95.39, 14577.848), (12, 287.11, 31931.756),
+    (12, 320.81, 34777.259), (9, 227.73, 1222.114), (8, 15.45, 16859.074),
+)
+
+def june_solstice(year):
+    """Instante (UTC, precisión ~1 minuto) del solsticio de junio, años 1000-3000."""
+    y = (year - 2000) / 1000
+    jde0 = 2451716.56767 + 365241.62603 * y + 0.00325 * y**2 + 0.00888 * y**3 - 0.00030 * y**4
+    t = (jde0 - 2451545.0) / 36525
+    w = math.radians(35999.373 * t - 2.47)
+    dlambda = 1 + 0.0334 * math.cos(w) + 0.0007 * math.cos(2 * w)
+    s = sum(a * math.cos(math.radians(b + c * t)) for a, b, c in _SOLSTICE_TERMS)
+    jde = jde0 + 0.00001 * s / dlambda
+    return datetime.datetime(1970, 1, 1) + datetime.timedelta(days=jde - 2440587.5)
+
+def _move_to_monday(day):
+    """Ley 19.668: martes a jueves pasan al lunes de esa semana; viernes al lunes siguiente."""
+    wd = day.weekday()
+    if wd in (1, 2, 3):
+        return day - datetime.timedelta(days=wd)
+    if wd == 4:
+        return day + datetime.timedelta(days=3)
+    return day
+
+def _evangelical_day(year):
+    """Ley 20.299: si el 31 de octubre es martes pasa al viernes anterior; si es miércoles, al viernes siguiente."""
+    day = datetime.date(year, 10, 31)
+    if day.weekday() == 1:
+        return day - datetime.timedelta(days=4)
+    if day.weekday() == 2:
+        return day + datetime.timedelta(days=2)
+    return day
+
+@lru_cache(maxsize=None)
+def holidays_for_year(year):
+    """Tupla ordenada de (fecha, nombre) con los feriados nacionales de ese año."""
+    D = datetime.date
+    easter = easter_sunday(year)
+    days = [
+        (D(year, 1, 1), "Año Nuevo"),
+        (easter - datetime.timedelta(days=2), "Viernes Santo"),
+        (easter - datetime.timedelta(days=1), "Sábado Santo"),
+        (D(year, 5, 1), "Día Nacional del Trabajo"),
+        (D(year, 5, 21), "Día de las Glorias Navales"),
+        (D(year, 8, 15), "Asunción de la Virgen"),
+        (D(year, 9, 18), "Independencia Nacional"),
+        (D(year, 9, 19), "Día de las Glorias del Ejército"),
+        (D(year, 11, 1), "Día de Todos los Santos"),
+        (D(year, 12, 8), "Inmaculada Concepción"),
+        (D(year, 12, 25), "Navidad"),
+    ]
+    if year >= 2017 and D(year, 1, 2).weekday() == 0:
+        days.append((D(year, 1, 2), "Feriado adicional de Año Nuevo"))
+    if year == 2021:
+        # Ley 21.357 fijó el 21 de junio para 2021; desde 2022 es el día del solsticio de invierno
+        days.append((D(2021, 6, 21), "Día Nacional de los Pueblos Indígenas"))
+    elif year > 2021:
+        solstice = june_solstice(year) + datetime.timedelta(hours=CHILE_WINTER_UTC_OFFSET)
+        days.append((solstice.date(), "Día Nacional de los Pueblos Indígenas"))
+    san_pedro = D(year, 6, 29)
+    days.append((_move_to_monday(san_pedro) if year >= 2000 else san_pedro, "San Pedro y San Pablo"))
+    if year >= 2007:
+        days.append((D(year, 7, 16), "Día de la Virgen del Carmen"))
+    # Fiestas Patrias: Ley 20.215 (lunes 17 desde 2007, viernes 20 desde 2008), Ley 20.983 (viernes 17 desde 2017)
+    sep17, sep20 = D(year, 9, 17), D(year, 9, 20)
+    if (year >= 2007 and sep17.weekday() == 0) or (year >= 2017 and sep17.weekday() == 4):
+        days.append((sep17, "Fiestas Patrias (17 de septiembre)"))
+    if year >= 2008 and sep20.weekday() == 4:
+        days.append((sep20, "Fiestas Patrias (viernes 20)"))
+    encuentro = D(year, 10, 12)
+    days.append((_move_to_monday(encuentro) if year >= 2000 else encuentro, "Encuentro de Dos Mundos"))
+    if year >= 2008:
+        days.append((_evangelical_day(year), "Día de las Iglesias Evangélicas y Protestantes"))
+    return tuple(sorted(set(days)))
+
+def holiday_dates(years):
+    """Lista de datetime.date de los feriados de los años indicados."""
+    return [d for y in years for d, _ in holidays_for_year(y)]
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Revisión rápida de planillas (sólo validación).
+Responde "¿qué planillas están malas?" antes del cierre mensual: sin agregación, sin
+feriados y sin preguntar por duplicados. Cada archivo se lee con sniff_planilla (encabezado,
+fila de proyectos y fila de totales, cortando en la celda guía si no es la plantilla), se
+valida por lotes con validate_batch y los errores se escriben a medida que aparecen en
+Errores_planillas.xlsx (openpyxl en modo write-only) o, más rápido, en Errores_planillas.csv.
+
+Uso: python revision.py   (revisa la carpeta actual y sus subcarpetas)
+"""
+import csv
+import os
+import time
+from itertools import islice
+from pathlib import Path
+import openpyxl
+from planillas import sniff_planilla
+from busqueda import find_planillas
+from ingesta import iter_ingest, auto_workers
+from validacion import ERROR_COLUMNS, validate_batch
+
+# "xlsx" | "csv"
+REVIEW_FORMAT = "xlsx"
+ERRORS_XLSX = "Errores_planillas.xlsx"
+ERRORS_CSV = "Errores_planillas.csv"
+# Procesos de lectura (None = según núcleos y volumen, ver ingesta.auto_workers)
+REVIEW_WORKERS = None
+# Registros por llamada a validate_batch; también marca cada cuánto se vacía el archivo CSV
+REVIEW_BATCH = 500
+DISCOVERY_WORKERS = 4
+
+# ---------------- salida en streaming ----------------
+class _CsvSink:
+    def __init__(self, path):
+        # utf-8-sig para que Excel abra bien los acentos
+        self.fh = open(path, "w", newline="", encoding="utf-8-sig")
+        self.writer = csv.writer(self.fh, delimiter=";")
+        self.writer.writerow(ERROR_COLUMNS)
+
+    def write(self, errors):
+        self.writer.writerows([er[c] for c in ERROR_COLUMNS] for er in errors)
+
+    def flush(self):
+        self.fh.flush()
+
+    def close(self):
+        self.fh.close()
+
+class _XlsxSink:
+    def __init__(self, path):
+        self.path = path
+        self.wb = openpyxl.Workbook(write_only=True)
+        self.ws = self.wb.create_sheet("Sheet1")
+        self.ws.append(ERROR_COLUMNS)
+
+    def write(self, errors):
+        for er in errors:
+            self.ws.append([er[c] for c in ERROR_COLUMNS])
+
+    def flush(self):
+        # el libro write-only sólo se puede guardar una vez, al cerrar
+        pass
+
+    def close(self):
+        self.wb.save(self.path)
+
+def open_sink(fmt=REVIEW_FORMAT):
+    if fmt == "csv":
+        return _CsvSink(ERRORS_CSV)
+    if fmt == "xlsx":
+        return _XlsxSink(ERRORS_XLSX)
+    raise ValueError(f"Formato de salida desconocido: {fmt}")
+
+# ---------------- revisión ----------------
+def _sniff(path: Path):
+    return sniff_planilla(path), []
+
+def _read_failed(path: Path, exc):
+    return None, [{'file': str(path), 'row': None, 'col': None, 'excel_cell': None,
+                   'issue': f'Error al leer archivo: {exc}', 'value': ''}]
+
+def _batches(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+def review(root_dir=None, fmt=REVIEW_FORMAT, workers=REVIEW_WORKERS, batch=REVIEW_BATCH, log=print):
+    """
+    Valida todas las planillas bajo root_dir (por defecto la carpeta actual) y escribe los
+    errores en el archivo de salida. Devuelve (archivos revisados, archivos con errores
+    graves, filas de error escritas).
+    """
+    root_dir = root_dir or os.getcwd()
+    paths = find_planillas(root_dir, workers=DISCOVERY_WORKERS)
+    if workers is None:
+        workers = auto_workers(paths)
+    log(f"Revisando {len(paths)} planillas ({workers} proceso(s))...")
+    n_files = n_bad = n_errors = 0
+    sink = open_sink(fmt)
+    try:
+        results = iter_ingest(paths, _sniff, _read_failed, workers=workers)
+        for chunk in _batches(results, batch):
+            table, valid = validate_batch([rec for _, rec, _ in chunk if rec is not None], fail_fast=True)
+            by_rec = {i: group[ERROR_COLUMNS].to_dict("records") for i, group in table.groupby("rec")}
+            k = 0
+            for p, rec, errors in chunk:
+                ok = False
+                if rec is not None:
+                    errors = errors + by_rec.get(k, [])
+                    ok = bool(valid[k])
+                    k += 1
+                n_files += 1
+                if errors:
+                    sink.write(errors)
+                    n_errors += len(errors)
+                if not ok:
+                    n_bad += 1
+                    log(f"  ✗ {p.name}: {errors[0]['issue']}")
+            sink.flush()
+    finally:
+        sink.close()
+    return n_files, n_bad, n_errors
+
+# ---------------- arranque ----------------
+def main():
+    t0 = time.perf_counter()
+    n_files, n_bad, n_errors = review()
+    out = ERRORS_CSV if REVIEW_FORMAT == "csv" else ERRORS_XLSX
+    print(f"\n{n_files} planillas revisadas en {time.perf_counter() - t0:.1f} s: "
+          f"{n_bad} con errores graves, {n_errors} error(es) en {out}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Comportamiento de consolidate() que cambió respecto del Omega armado con Name+Year en texto."""
+import numpy as np
+import pandas as pd
+from agregacion import consolidate
+
+def _alfa(rows):
+    return pd.DataFrame(rows, columns=["Name", "Month", "Year", "P1"])
+
+def test_omega_is_ordered_by_name_then_year():
+    Alfa = _alfa([
+        ("Ana", 1, 2025, 1.0),
+        ("Ana1", 1, 2024, 2.0),
+        ("Ana", 2, 2024, 3.0),
+        ("Ana1", 3, 2024, 4.0),
+        ("Bea", 1, 2024, 5.0),
+    ])
+    _, Omega, _ = consolidate(Alfa)
+    # antes la clave "Ana12024" quedaba antes que "Ana2024" y se partía en ("Ana1", 2024) sólo
+    # por los 4 últimos caracteres; ahora el orden es por Name y luego por Year
+    assert list(Omega.itertuples(index=False, name=None)) == [
+        ("Ana", 2024, 3.0),
+        ("Ana", 2025, 1.0),
+        ("Ana1", 2024, 6.0),
+        ("Bea", 2024, 5.0),
+    ]
+
+def test_omega_and_suma_are_summed_before_rounding():
+    Alfa = _alfa([("Ana", m, 2025, 1 / 3) for m in (1, 2, 3)])
+    realizadas, Omega, Suma = consolidate(Alfa)
+    # sumar Alfa ya redondeado daba 0.99; ahora se suma sin redondear y se redondea al final
+    assert np.round(Omega["P1"], 2).tolist() == [1.0]
+    assert np.round(Suma["Total"], 2).tolist() == [1.0]
+    assert np.round(realizadas, 2).tolist() == [0.33, 0.33, 0.33]
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import datetime
+import math
+import pickle
+import sqlite3
+from cache_planillas import PlanillaCache, CACHE_VERSION
+from planillas import PlanillaRecord
+
+class _Boom:
+    def __reduce__(self):
+        return (exec, ("raise SystemExit('pickle ejecutado')",))
+
+def _record(path):
+    rec = PlanillaRecord(path, "Ana", "Enero", datetime.datetime(2025, 1, 1), "guía",
+                         ["P1", None, 101], [7.5, float("nan"), datetime.time(6, 0)])
+    rec.set_period(1, 2025)
+    return rec
+
+def test_roundtrip_keeps_every_field(tmp_path):
+    path = tmp_path / "ana.xlsx"
+    path.write_bytes(b"planilla")
+    errors = [{"file": str(path), "row": 3, "col": 12, "excel_cell": "L3", "issue": "x", "value": ""}]
+    cache = PlanillaCache(tmp_path / "cache.sqlite", namespace="t")
+    cache.put(path, _record(path), errors)
+    rec, got_errors = cache.get(path)
+    assert got_errors == errors
+    assert rec.path == path and rec.name == "Ana" and rec.month_raw == "Enero"
+    assert rec.year_raw == datetime.datetime(2025, 1, 1)
+    assert (rec.month, rec.year) == (1, 2025)
+    assert rec.projects == ["P1", None, 101]
+    totals = rec.totals
+    assert totals[0] == 7.5 and math.isnan(totals[1]) and totals[2] == datetime.time(6, 0)
+    cache.close()
+
+def test_invalid_record_is_cached_as_none(tmp_path):
+    path = tmp_path / "mala.xlsx"
+    path.write_bytes(b"planilla")
+    cache = PlanillaCache(tmp_path / "cache.sqlite", namespace="t")
+    cache.put(path, None, ["mala.xlsx: error"])
+    assert cache.get(path) == (None, ["mala.xlsx: error"])
+    cache.close()
+
+def test_payload_is_never_unpickled(tmp_path):
+    path = tmp_path / "ana.xlsx"
+    path.write_bytes(b"planilla")
+    db = tmp_path / "cache.sqlite"
+    cache = PlanillaCache(db, namespace="t")
+    cache.put(path, _record(path), [])
+    cache.close()
+    # alguien con escritura sobre la carpeta compartida reemplaza el valor guardado
+    conn = sqlite3.connect(str(db))
+    conn.execute("UPDATE planillas SET payload=?", (pickle.dumps(_Boom()),))
+    conn.commit()
+    conn.close()
+    cache = PlanillaCache(db, namespace="t")
+    assert cache.get(path) is None
+    assert cache.misses == 1
+    cache.close()
+
+def test_old_versions_are_dropped(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    PlanillaCache(db, namespace="t").close()
+    conn = sqlite3.connect(str(db))
+    conn.execute("INSERT INTO planillas VALUES ('x', 't:2', 1, 1, 'h', ?)", (pickle.dumps(_Boom()),))
+    conn.commit()
+    conn.close()
+    PlanillaCache(db, namespace="t").close()
+    conn = sqlite3.connect(str(db))
+    assert conn.execute("SELECT namespace FROM planillas").fetchall() == []
+    conn.close()
+    assert CACHE_VERSION >= 3
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+import zipfile
+from duplicados import iter_unique
+
+def _xlsx(path, content):
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(zipfile.ZipInfo("xl/workbook.xml", (2025, 1, 1, 0, 0, 0)), content)
+
+def test_iter_unique_streams_and_drops_identical_copies(tmp_path):
+    a = tmp_path / "a.xlsx"
+    b = tmp_path / "b.xlsx"
+    copy = tmp_path / "copia de a.xlsx"
+    _xlsx(a, "planilla A")
+    _xlsx(b, "planilla B")
+    _xlsx(copy, "planilla A")
+    logged = []
+    pulled = []
+    def discover():
+        for p in (a, b, copy):
+            pulled.append(p)
+            yield p
+
+    stream = iter_unique(discover(), logged.append)
+
+    assert next(stream) == a
+    assert pulled == [a]
+    assert list(stream) == [b]
+    assert len(logged) == 1 and "copia de a.xlsx" in logged[0]
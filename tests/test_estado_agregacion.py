@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import os
+import numpy as np
+import pandas as pd
+from agregacion import HoursBuilder, consolidate
+from estado_agregacion import AggregateState
+
+def _write(path, n=[0]):
+    # contenido distinto y mtime nuevo: la firma (tamaño, mtime) cambia
+    n[0] += 1
+    path.write_text(f"planilla {n[0]}" * n[0])
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + n[0] * 1000))
+
+def _run(state, files):
+    builder = HoursBuilder()
+    for name, month, year, projects, hours in files.values():
+        builder.add(name, month, year, projects, hours)
+    counts = state.sync(builder, list(files))
+    Alfa = builder.frame()
+    Omega, Suma = state.omega(Alfa[["Name", "Month", "Year"]], builder.project_names)
+    _, Omega0, Suma0 = consolidate(Alfa)
+    pd.testing.assert_frame_equal(Omega.iloc[:, :2], Omega0.iloc[:, :2], check_dtype=False)
+    assert list(Omega.columns) == list(Omega0.columns)
+    assert np.array_equal(Omega.iloc[:, 2:].to_numpy(float).round(2), Omega0.iloc[:, 2:].to_numpy(float).round(2))
+    assert np.array_equal(Suma["Total"].round(2).to_numpy(), Suma0["Total"].round(2).to_numpy())
+    return counts
+
+def _files(tmp_path, n, seed=3):
+    rng = np.random.default_rng(seed)
+    names = [f"Persona {k}" for k in range(20)] + ["Ana1", None]
+    projects = [f"P{k}" for k in range(12)] + [7]
+    files = {}
+    for i in range(n):
+        path = tmp_path / f"f{i}.xlsx"
+        _write(path)
+        picked = [projects[k] for k in rng.integers(0, len(projects), 5)]
+        files[path] = (names[rng.integers(0, len(names))], int(rng.integers(1, 13)),
+                       int(rng.choice([2024, 2025])), picked, list(rng.random(5).round(2) * 8))
+    return files
+
+def test_sync_matches_full_recompute(tmp_path):
+    files = _files(tmp_path, 200)
+    state = AggregateState(tmp_path / "estado.sqlite")
+    assert _run(state, files) == (200, 0, 0)
+    assert _run(state, files) == (0, 0, 0)
+
+    paths = list(files)
+    for p in paths[:5]:
+        name, month, year, projects, hours = files[p]
+        files[p] = ("Ana1", month, 2025, projects, [h + 1 for h in hours])
+        _write(p)
+    for p in paths[5:9]:
+        del files[p]                 # p.ej. eliminados por duplicado
+    (tmp_path / "nuevos").mkdir()
+    files.update(_files(tmp_path / "nuevos", 3, seed=9))
+    assert _run(state, files) == (3, 5, 4)
+    assert _run(state, dict(reversed(list(files.items())))) == (0, 0, 0)
+    state.close()
+
+    # el estado sobrevive entre corridas
+    reopened = AggregateState(tmp_path / "estado.sqlite")
+    assert _run(reopened, files) == (0, 0, 0)
+    reopened.close()
+
+def test_only_touched_groups_are_recomputed(tmp_path):
+    files = _files(tmp_path, 120)
+    state = AggregateState(tmp_path / "estado.sqlite")
+    _run(state, files)
+    before = dict(((gid, pid), rowid) for rowid, gid, pid in
+                  state.conn.execute("SELECT rowid, gid, pid FROM omega"))
+
+    p = next(iter(files))
+    name, month, year, projects, hours = files[p]
+    files[p] = (name, month, year, projects, [h + 2 for h in hours])
+    _write(p)
+    assert _run(state, files) == (0, 1, 0)
+
+    touched = state.conn.execute("SELECT g.gid FROM groups g JOIN files f ON f.gid = g.gid WHERE f.path = ?",
+                                 (os.path.abspath(p),)).fetchone()[0]
+    after = dict(((gid, pid), rowid) for rowid, gid, pid in
+                 state.conn.execute("SELECT rowid, gid, pid FROM omega"))
+    untouched = {k: v for k, v in before.items() if k[0] != touched}
+    assert untouched and all(after[k] == v for k, v in untouched.items())
+    state.close()
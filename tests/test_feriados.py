@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import feriados
+from feriados import HolidayStore, fetch_holidays_chile
+
+class _HangingSession:
+    """Sesión cuyas solicitudes no responden a tiempo (servidor colgado)."""
+    def __init__(self):
+        self.release = threading.Event()
+        self.threads = []
+
+    def get(self, url, headers=None, timeout=None, **kwargs):
+        self.threads.append(threading.current_thread())
+        self.release.wait(5)
+        raise feriados.requests.Timeout(url)
+
+def test_foreground_refresh_shares_one_deadline(monkeypatch, tmp_path):
+    store = HolidayStore(tmp_path / "feriados.json", ttl=0)
+    store.put(2024, [], "primary")           # vencido (ttl=0): revalidación en primer plano
+    session = _HangingSession()
+    monkeypatch.setattr(feriados, "shared_session", lambda: session)
+
+    start = time.monotonic()
+    df = fetch_holidays_chile([2024, 2025], store=store, background=False, deadline=0.3, mode="online")
+    elapsed = time.monotonic() - start
+    session.release.set()
+
+    # años ausentes y vencidos comparten el mismo plazo, no uno cada uno
+    assert elapsed < 0.55
+    assert df.empty
+    # las descargas abandonadas no retienen el cierre del intérprete
+    assert session.threads and all(t.daemon for t in session.threads)
+
+class _DownSession:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url, headers=None, timeout=None, **kwargs):
+        self.calls += 1
+        raise feriados.requests.ConnectionError(url)
+
+def test_auto_mode_stores_rules_result_under_ttl(monkeypatch, tmp_path):
+    monkeypatch.setattr(feriados, "BACKOFF", 0)
+    session = _DownSession()
+    monkeypatch.setattr(feriados, "shared_session", lambda: session)
+    store = HolidayStore(tmp_path / "feriados.json")
+
+    first = fetch_holidays_chile([2025], store=store, background=False, mode="auto")
+    calls = session.calls
+    second = fetch_holidays_chile([2025], store=store, background=False, mode="auto")
+
+    assert calls > 0
+    assert session.calls == calls            # el año calculado por reglas no vuelve a la red
+    assert store.get(2025)["source"] == "rules"
+    assert list(first["fecha"]) == list(second["fecha"])
+    assert not first.empty
+    # "online" no usa lo calculado por reglas
+    assert fetch_holidays_chile([2025], store=store, background=False, mode="online").empty
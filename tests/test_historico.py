@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import pytest
+from agregacion import HoursBuilder
+
+pytest.importorskip("pyarrow")
+from historico import HistoryArchive
+
+def _run(files):
+    """HoursBuilder y rutas de una corrida: files = {ruta: (nombre, mes, año, proyectos, horas)}."""
+    builder = HoursBuilder()
+    for name, month, year, projects, hours in files.values():
+        builder.add(name, month, year, projects, hours)
+    return builder, list(files)
+
+def _omega(archive, name, year, project):
+    _, Omega = archive.rebuild()
+    row = Omega[(Omega["Name"] == name) & (Omega["Year"] == year)]
+    return float(row[project].iloc[0])
+
+def test_deleted_duplicate_leaves_the_archive(tmp_path):
+    original, copy = tmp_path / "ana.xlsx", tmp_path / "ana (1).xlsx"
+    for p in (original, copy):
+        p.write_bytes(b"planilla")
+    data = ("ana", 3, 2024, ["P1"], [5.0])
+    archive = HistoryArchive(tmp_path / "historico")
+
+    assert archive.upsert(*_run({original: data, copy: data})) == (2, 0, 0)
+    assert _omega(archive, "ana", 2024, "P1") == 10.0
+
+    # la deduplicación borra la copia más antigua y la corrida sólo conserva una
+    original.unlink()
+    assert archive.upsert(*_run({copy: data})) == (0, 1, 1)
+    assert _omega(archive, "ana", 2024, "P1") == 5.0
+    assert set(archive.load()["source"]) == {str(copy.resolve())}
+
+def test_months_outside_the_run_keep_their_history(tmp_path):
+    old, new = tmp_path / "enero.xlsx", tmp_path / "febrero.xlsx"
+    for p in (old, new):
+        p.write_bytes(b"planilla")
+    archive = HistoryArchive(tmp_path / "historico")
+    archive.upsert(*_run({old: ("ana", 1, 2024, ["P1"], [4.0])}))
+    old.unlink()
+    assert archive.upsert(*_run({new: ("ana", 2, 2024, ["P1"], [6.0])})) == (1, 0, 0)
+    assert archive.partitions() == [(2024, 1), (2024, 2)]
+    assert _omega(archive, "ana", 2024, "P1") == 10.0
+
+def test_repeated_run_is_idempotent(tmp_path):
+    p = tmp_path / "ana.xlsx"
+    p.write_bytes(b"planilla")
+    archive = HistoryArchive(tmp_path / "historico")
+    run = _run({p: ("ana", 3, 2024, ["P1", "P2"], [1.5, 2.5])})
+    assert archive.upsert(*run) == (1, 0, 0)
+    assert archive.upsert(*run) == (0, 1, 0)
+    assert len(archive.load()) == 2
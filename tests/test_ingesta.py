@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import ingesta
+
+class _Cache:
+    def __init__(self, hits):
+        self.hits = dict(hits)
+        self.stored = {}
+
+    def get(self, p):
+        return self.hits.get(p)
+
+    def put(self, p, rec, errors):
+        self.stored[p] = (rec, errors)
+
+def _inspect(p):
+    return f"rec {p}", []
+
+def _failed(p, exc):
+    return None, [str(exc)]
+
+def test_pool_is_sized_from_cache_misses(monkeypatch, tmp_path):
+    paths = [tmp_path / f"{i}.xlsx" for i in range(40)]
+    for p in paths:
+        p.write_bytes(b"x" * 10)
+    cache = _Cache({p: (f"cached {p}", []) for p in paths if p != paths[7]})
+    sized = []
+    monkeypatch.setattr(ingesta, "auto_workers", lambda pending: sized.append(list(pending)) or 8)
+    def no_pool(*args, **kwargs):
+        raise AssertionError("no se debe levantar el pool por un solo archivo")
+    monkeypatch.setattr(ingesta, "ProcessPoolExecutor", no_pool)
+
+    results = ingesta.ingest(paths, _inspect, _failed, cache=cache)
+
+    assert sized == [[paths[7]]]
+    assert [p for p, _, _ in results] == paths
+    assert results[7][1] == f"rec {paths[7]}"
+    assert results[0][1] == f"cached {paths[0]}"
+    assert cache.stored == {paths[7]: (f"rec {paths[7]}", [])}
+
+def test_serial_without_cache_keeps_order(tmp_path):
+    paths = [tmp_path / f"{i}.xlsx" for i in range(5)]
+    results = ingesta.ingest(paths, _inspect, _failed, workers=1)
+    assert [(p, rec) for p, rec, _ in results] == [(p, f"rec {p}") for p in paths]
+
+def test_iter_ingest_sizes_pool_per_block_and_streams(monkeypatch, tmp_path):
+    monkeypatch.setattr(ingesta, "STREAM_BLOCK", 4)
+    sized = []
+    monkeypatch.setattr(ingesta, "auto_workers", lambda pending: sized.append(list(pending)) or 1)
+    pulled = []
+    def discover():
+        for i in range(10):
+            pulled.append(i)
+            yield tmp_path / f"{i}.xlsx"
+
+    stream = ingesta.iter_ingest(discover(), _inspect, _failed)
+    first = next(stream)
+
+    assert first[1] == f"rec {tmp_path / '0.xlsx'}"
+    # sólo se leyó el primer bloque de rutas y el pool se dimensionó con él
+    assert pulled == [0, 1, 2, 3]
+    assert sized == [[tmp_path / f"{i}.xlsx" for i in range(4)]]
+    rest = list(stream)
+    assert [p.name for p, _, _ in [first] + rest] == [f"{i}.xlsx" for i in range(10)]
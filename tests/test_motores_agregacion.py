@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Paridad de los motores columnares (polars, duckdb) con el camino pandas de aggregate()."""
+import importlib.util
+import numpy as np
+import pandas as pd
+import pytest
+from agregacion import HoursBuilder
+from motores_agregacion import aggregate
+
+def _engine(name):
+    # motores opcionales: sin el paquete instalado su caso se omite
+    missing = importlib.util.find_spec(name) is None
+    return pytest.param(name, marks=pytest.mark.skipif(missing, reason=f"{name} no instalado"))
+
+ENGINES = [_engine("polars"), _engine("duckdb")]
+
+def _builder(n, seed=7):
+    rng = np.random.default_rng(seed)
+    # nombres vacíos, proyectos numéricos/vacíos y repetidos dentro de una planilla
+    names = ["Ana", "Ana B", "Luis", "Pía", None]
+    projects = [f"Proy {i}" for i in range(60)] + [101, 202, None]
+    builder = HoursBuilder()
+    for _ in range(n):
+        picked = [projects[i] for i in rng.integers(0, len(projects), 19)]
+        builder.add(names[rng.integers(0, len(names))], int(rng.integers(1, 13)),
+                    int(rng.choice([2023, 2024, 2025])), picked, list(rng.random(19).round(2) * 8))
+    return builder
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("n", [1, 2, 300, 5000])
+def test_engine_matches_pandas(engine, n):
+    builder = _builder(n)
+    Alfa0, realizadas0, Omega0, Suma0 = aggregate(builder, engine="pandas")
+    Alfa, realizadas, Omega, Suma = aggregate(builder, engine=engine)
+
+    # mismas claves, en el mismo orden de filas, y mismas columnas en el mismo orden
+    assert list(Alfa.columns) == list(Alfa0.columns)
+    assert list(Omega.columns) == list(Omega0.columns)
+    assert list(Suma.index) == list(Suma0.index)
+    pd.testing.assert_frame_equal(Alfa.iloc[:, :3], Alfa0.iloc[:, :3], check_dtype=False)
+    pd.testing.assert_frame_equal(Omega.iloc[:, :2], Omega0.iloc[:, :2], check_dtype=False)
+
+    assert np.allclose(Alfa.iloc[:, 3:].to_numpy(float), Alfa0.iloc[:, 3:].to_numpy(float))
+    assert np.allclose(Omega.iloc[:, 2:].to_numpy(float), Omega0.iloc[:, 2:].to_numpy(float))
+    assert np.allclose(Suma["Total"].to_numpy(float), Suma0["Total"].to_numpy(float))
+    assert np.allclose(np.asarray(realizadas, dtype=float), np.asarray(realizadas0, dtype=float))
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_group_by_name_month_year(engine):
+    builder = _builder(500, seed=11)
+    _, _, Omega0, _ = aggregate(builder, engine="pandas", by=("Name", "Month", "Year"))
+    _, _, Omega, _ = aggregate(builder, engine=engine, by=("Name", "Month", "Year"))
+    pd.testing.assert_frame_equal(Omega.iloc[:, :3], Omega0.iloc[:, :3], check_dtype=False)
+    assert np.allclose(Omega.iloc[:, 3:].to_numpy(float), Omega0.iloc[:, 3:].to_numpy(float))
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        aggregate(_builder(1), engine="spark")
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import datetime
+import openpyxl
+import pytest
+from planillas import (extract_planilla, GUIDE_TEXT, NAME_CELL, MONTH_CELL, YEAR_CELL, GUIDE_CELL,
+                       PROJECTS_ROW, TOTALS_ROW, FIRST_PROJECT_COL)
+
+def _planilla(path, year, totals, year_format=None, total_format=None, date1904=False):
+    wb = openpyxl.Workbook()
+    if date1904:
+        wb.epoch = openpyxl.utils.datetime.CALENDAR_MAC_1904
+    ws = wb.active
+    ws.cell(*NAME_CELL, "Ana")
+    ws.cell(*MONTH_CELL, "Enero")
+    cell = ws.cell(*YEAR_CELL, year)
+    if year_format:
+        cell.number_format = year_format
+    ws.cell(*GUIDE_CELL, GUIDE_TEXT)
+    for i, total in enumerate(totals):
+        ws.cell(PROJECTS_ROW, FIRST_PROJECT_COL + i, f"P{i}")
+        cell = ws.cell(TOTALS_ROW, FIRST_PROJECT_COL + i, total)
+        if total_format:
+            cell.number_format = total_format
+    wb.save(path)
+    return path
+
+def _same(a, b):
+    # NaN marca una celda vacía en los dos motores
+    return len(a) == len(b) and all(x == y or (x != x and y != y) for x, y in zip(a, b))
+
+@pytest.mark.parametrize("year, totals, year_format, total_format, date1904", [
+    (2025, [8, 4.5], None, None, False),
+    (datetime.datetime(2025, 1, 1), [8], "yyyy", None, False),            # formato propio
+    (datetime.datetime(2025, 1, 1), [8], "mm-dd-yy", None, False),        # integrado (14)
+    (2025, [datetime.time(6, 0), datetime.time(1, 30)], None, "h:mm", False),
+    (2025, [datetime.timedelta(hours=30)], None, "[h]:mm:ss", False),
+    (datetime.datetime(2025, 1, 1), [datetime.time(6, 0)], "dd/mm/yyyy", "h:mm", True),
+])
+def test_xml_engine_matches_openpyxl(tmp_path, year, totals, year_format, total_format, date1904):
+    path = _planilla(tmp_path / "p.xlsx", year, totals, year_format, total_format, date1904)
+    fast = extract_planilla(path, engine="xml")
+    slow = extract_planilla(path, engine="openpyxl")
+    assert fast.year_raw == slow.year_raw
+    assert type(fast.year_raw) is type(slow.year_raw)
+    assert _same(fast.totals, slow.totals)
+
+def test_date_year_is_not_a_serial(tmp_path):
+    path = _planilla(tmp_path / "p.xlsx", datetime.datetime(2025, 1, 1), [8], "mm-dd-yy")
+    assert isinstance(extract_planilla(path).year_raw, datetime.datetime)
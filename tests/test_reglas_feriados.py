@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import datetime
+import pytest
+from reglas_feriados import holidays_for_year
+
+D = datetime.date
+
+def _dates(year):
+    return {d for d, _ in holidays_for_year(year)}
+
+@pytest.mark.parametrize("day", [
+    D(2012, 9, 17),  # lunes 17, Ley 20.215
+    D(2013, 9, 20),  # viernes 20, Ley 20.215
+    D(2019, 9, 20),
+    D(2021, 9, 17),  # viernes 17, Ley 20.983
+    D(2027, 9, 17),
+])
+def test_fiestas_patrias_extra_days(day):
+    assert day in _dates(day.year)
+
+@pytest.mark.parametrize("day", [
+    D(2007, 9, 20),  # viernes 20 sólo desde 2008
+    D(2015, 9, 17),  # jueves 17
+    D(2016, 9, 20),  # martes 20
+])
+def test_fiestas_patrias_ordinary_days(day):
+    assert day not in _dates(day.year)
+
+def test_matches_python_holidays():
+    holidays = pytest.importorskip("holidays")
+    # feriados únicos por ley especial (bicentenario, censo 2017, 16-sep-2022): fuera del alcance
+    special = {D(2010, 9, 17), D(2010, 9, 20), D(2017, 4, 19), D(2022, 9, 16)}
+    for year in range(2008, 2031):
+        expected = set(holidays.Chile(years=year)) - special
+        assert _dates(year) == expected, year
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Validación en lote de planillas ya extraídas.
+Los registros se apilan en bloques columnares (encabezados, matriz de ids de proyecto y
+matriz de horas, una fila por archivo) y cada regla es una operación vectorizada sobre
+el bloque completo; el resultado es una sola tabla de errores con las mismas columnas y
+mensajes que la validación celda a celda (file, row, col, excel_cell, issue, value).
+"""
+import numpy as np
+import pandas as pd
+from planillas import PROJECTS, GUIDE_TEXT, FIRST_PROJECT_COL
+
+MONTHS = {
+    "enero":1,"ene":1,
+    "febrero":2,"feb":2,
+    "marzo":3,"mar":3,
+    "abril":4,"abr":4,
+    "mayo":5,"may":5,
+    "junio":6,"jun":6,
+    "julio":7,"jul":7,
+    "agosto":8,"ago":8,
+    "septiembre":9,"setiembre":9,"sep":9,"set":9,
+    "octubre":10,"oct":10,
+    "noviembre":11,"nov":11,
+    "diciembre":12,"dic":12
+}
+
+ERROR_COLUMNS = ["file", "row", "col", "excel_cell", "issue", "value"]
+# Errores que invalidan el archivo (la celda guía distinta o los totales NaN sólo se informan)
+SEVERE_CHECKS = ("month", "year", "no_projects", "no_totals")
+# Orden de los errores dentro de un archivo, igual al de la validación celda a celda
+_CHECK_ORDER = {"guide": 0, "month": 1, "year": 2, "no_projects": 3, "project": 3,
+                "no_totals": 4, "nan_total": 4, "text_total": 4}
+# Reglas sobre las filas de proyectos/totales, que la lectura con fail_fast no alcanza a leer
+_BODY_CHECKS = ("no_projects", "project", "no_totals", "nan_total", "text_total")
+
+def month_numbers(values):
+    """Mes (1-12) de cada valor; NaN si no se reconoce."""
+    return pd.Series(values, dtype=object).astype(str).str.strip().str.lower().map(MONTHS)
+
+def _int_convertible(values):
+    """Equivalente vectorizado de int(v) sin excepción: números finitos o texto de dígitos."""
+    s = pd.Series(values, dtype=object)
+    is_text = s.map(type) == str
+    numeric = pd.to_numeric(s.where(~is_text), errors="coerce")
+    ok = numeric.notna() & np.isfinite(numeric.fillna(0).astype(float))
+    text_ok = s.where(is_text, "").str.fullmatch(r"\s*[+-]?\d+\s*").fillna(False)
+    return (ok & ~is_text) | (is_text & text_ok)
+
+class RecordBlock:
+    """Registros apilados: columnas de encabezado y matrices n x 19 de proyectos/horas."""
+    def __init__(self, records):
+        self.records = list(records)
+        n = len(self.records)
+        self.files = np.array([str(r.path) for r in self.records], dtype=object)
+        self.guide = np.array([r.guide for r in self.records], dtype=object)
+        self.month_raw = np.array([r.month_raw for r in self.records], dtype=object)
+        self.year_raw = np.array([r.year_raw for r in self.records], dtype=object)
+        width = max((len(r.project_ids) for r in self.records), default=0)
+        self.project_ids = np.full((n, width), -1, dtype=np.int32)
+        self.hours = np.full((n, width), np.nan, dtype=np.float64)
+        self.n_projects = np.zeros(n, dtype=np.int64)
+        self.n_totals = np.zeros(n, dtype=np.int64)
+        extras = []
+        for i, r in enumerate(self.records):
+            # array('i') / array('d') se copian por buffer, sin recorrer valor a valor
+            self.project_ids[i, :len(r.project_ids)] = np.frombuffer(r.project_ids, dtype=np.int32)
+            self.hours[i, :len(r.hours)] = np.frombuffer(r.hours, dtype=np.float64)
+            self.n_projects[i] = len(r.project_ids)
+            self.n_totals[i] = len(r.hours)
+            if r.extras:
+                extras.extend((i, idx, v) for idx, v in r.extras.items())
+        self.extras = pd.DataFrame(extras, columns=["rec", "pos", "value"])
+
+def _frame(block, rec, check, pos, row, col, excel_cell, issue, value):
+    rec = np.asarray(rec)
+    n = len(rec)
+    def col_of(v):
+        # object: row/col mezclan enteros y rangos ('P:AL') y no deben pasar a float al concatenar
+        return np.asarray(v if isinstance(v, (np.ndarray, pd.Series, list)) else [v] * n, dtype=object)
+    return pd.DataFrame({
+        "rec": rec, "check": _CHECK_ORDER[check], "pos": col_of(pos), "kind": check,
+        "file": block.files[rec], "row": col_of(row), "col": col_of(col),
+        "excel_cell": col_of(excel_cell), "issue": col_of(issue), "value": col_of(value),
+    })
+
+def validate_batch(records, fail_fast=False):
+    """
+    Devuelve (errores, válidos): DataFrame con ERROR_COLUMNS (más 'rec', índice del registro)
+    y una máscara booleana de los registros sin errores graves.
+    fail_fast=True corresponde a registros leídos con sniff_planilla: una celda guía distinta
+    invalida el archivo y sólo se informan sus errores de encabezado.
+    """
+    block = records if isinstance(records, RecordBlock) else RecordBlock(records)
+    n = len(block.records)
+    parts = []
+
+    # 1) celda guía
+    # str() y no astype(str): pandas convierte None en 'nan' y el reporte debe decir 'None'
+    guide_text = np.array([str(v) for v in block.guide], dtype=object)
+    bad = np.flatnonzero(guide_text != GUIDE_TEXT)
+    parts.append(_frame(block, bad, "guide", 0, 2, 16, 'R2C16 (fila2,col16)',
+                        'Texto esperado no coincide', guide_text[bad]))
+
+    # 2) mes reconocible
+    bad = np.flatnonzero(month_numbers(block.month_raw).isna().to_numpy())
+    parts.append(_frame(block, bad, "month", 0, 2, 4, 'D2', 'Mes no reconocido',
+                        [str(v) for v in block.month_raw[bad]]))
+
+    # 3) año convertible a entero
+    bad = np.flatnonzero(~_int_convertible(block.year_raw).to_numpy())
+    parts.append(_frame(block, bad, "year", 0, 2, 12, 'L2', 'Año no convertible a entero',
+                        [str(v) for v in block.year_raw[bad]]))
+
+    # 4) nombres de proyecto
+    bad = np.flatnonzero(block.n_projects == 0)
+    parts.append(_frame(block, bad, "no_projects", 0, 4, 'P:AL', 'P4:AL4',
+                        'No se detectaron nombres de proyectos en el rango', ''))
+    names = np.array(PROJECTS.names + [None], dtype=object)     # id -1 -> None
+    blank_name = np.array([str(v).strip() == "" for v in PROJECTS.names] + [True])
+    ids = block.project_ids
+    in_range = np.arange(ids.shape[1])[None, :] < block.n_projects[:, None]
+    rec, pos = np.nonzero(blank_name[ids] & in_range)
+    cols = FIRST_PROJECT_COL + pos
+    parts.append(_frame(block, rec, "project", pos, 4, cols, [f'{c} (fila4)' for c in cols],
+                        'Nombre de proyecto vacío', [str(v) for v in names[ids[rec, pos]]]))
+
+    # 5) totales de horas
+    bad = np.flatnonzero(block.n_totals == 0)
+    parts.append(_frame(block, bad, "no_totals", 0, 38, 'P:AL', 'P38:AL38',
+                        'No se detectaron totales de horas en el rango', ''))
+    in_range = np.arange(block.hours.shape[1])[None, :] < block.n_totals[:, None]
+    is_nan = np.isnan(block.hours) & in_range
+    if len(block.extras):
+        is_nan[block.extras["rec"].to_numpy(), block.extras["pos"].to_numpy()] = False
+    rec, pos = np.nonzero(is_nan)
+    cols = FIRST_PROJECT_COL + pos
+    parts.append(_frame(block, rec, "nan_total", pos, 38, cols, [f'{c} (fila38)' for c in cols],
+                        'Total horas es NaN (será tratado como 0)', 'nan'))
+    if len(block.extras):
+        ex = block.extras
+        values = ex["value"]
+        is_text = values.map(type) == str
+        numeric_text = pd.to_numeric(values.where(is_text), errors="coerce").notna()
+        is_number = values.map(lambda v: isinstance(v, (bool, int, float)))
+        ex = ex[~(is_number | (is_text & numeric_text))]
+        cols = FIRST_PROJECT_COL + ex["pos"].to_numpy()
+        parts.append(_frame(block, ex["rec"].to_numpy(), "text_total", ex["pos"].to_numpy(), 38, cols,
+                            [f'{c} (fila38)' for c in cols], 'Total horas no es numérico',
+                            [str(v) for v in ex["value"]]))
+
+    errors = pd.concat(parts, ignore_index=True)
+    cut = np.zeros(n, dtype=bool)
+    if fail_fast:
+        cut[guide_text != GUIDE_TEXT] = True
+        errors = errors[~(cut[errors["rec"].to_numpy(dtype=np.int64)] & errors["kind"].isin(_BODY_CHECKS))]
+    errors = errors.sort_values(["rec", "check", "pos"], kind="stable").reset_index(drop=True)
+    severe = errors.loc[errors["kind"].isin(SEVERE_CHECKS), "rec"].to_numpy()
+    valid = ~cut
+    valid[severe] = False
+    return errors[["rec"] + ERROR_COLUMNS], valid